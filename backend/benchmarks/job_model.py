@@ -0,0 +1,67 @@
+"""
+Per-job cost of building provider jobs and dumping them for the response and
+BigQuery: one Job at a time against the batch path of models.job. Both paths
+do the same work; with --encode they also encode the dump as the response
+body, the way /search does.
+
+    python -m benchmarks.job_model [--jobs 150] [--repeat 200] [--encode]
+"""
+
+import argparse
+import timeit
+
+from models.job import Job, dump_jobs, validate_jobs
+from services.responses import dumps
+
+
+def make_rows(count: int) -> list:
+    return [
+        {
+            "title": f"Alternance développeur {i}",
+            "company": f"Company {i % 40}",
+            "city": "Paris",
+            "url": f"https://www.welcometothejungle.com/fr/companies/c{i}/jobs/j{i}",
+            "contract_type": "Alternance",
+            "target_diploma_level": "Bac+5",
+            "source": "WTTJ",
+            "latitude": 48.85,
+            "longitude": 2.35,
+        }
+        for i in range(count)
+    ]
+
+
+def per_job(rows: list) -> list:
+    # previous path: a Job per hit, each dumped on its own
+    jobs = [Job(**row) for row in rows]
+    return [job.model_dump() for job in jobs]
+
+
+def batch(rows: list) -> list:
+    return dump_jobs(validate_jobs(rows))
+
+
+def encoded(build):
+    def run(rows: list) -> bytes:
+        return dumps(build(rows))
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=150)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--encode", action="store_true")
+    args = parser.parse_args()
+
+    rows = make_rows(args.jobs)
+    for name, build in (("per job", per_job), ("batch", batch)):
+        run = encoded(build) if args.encode else build
+        seconds = min(timeit.repeat(lambda: run(rows), number=args.repeat, repeat=3))
+        micros = seconds / (args.repeat * args.jobs) * 1e6
+        print(f"{name:>8}: {micros:.2f} µs/job")
+
+
+if __name__ == "__main__":
+    main()
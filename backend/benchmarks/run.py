@@ -0,0 +1,294 @@
+"""
+Load test of the JobNexus API, served by uvicorn in-process, against local
+stand-ins for every upstream (see benchmarks.stubs).
+
+    python -m benchmarks.run --profile realistic --concurrency 1,10,50
+    python -m benchmarks.run --scenarios search,search_stream --requests 500
+    python -m benchmarks.run --baseline benchmarks/results/<earlier run>.json
+
+Every scenario runs at each concurrency level and reports p50/p95/p99
+latency, throughput and errors, then once more under tracemalloc for the
+peak memory allocated while serving. Results are written as JSON to
+benchmarks/results/; pass an earlier file as --baseline to print the change.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+from unittest.mock import patch
+
+import httpx
+import uvicorn
+
+from benchmarks.stubs import FakeBigQuery, FakeFirestore, ProviderStubs, load_profile
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# stand-in credentials, the upstreams are local
+for name in ("FT_CLIENT_ID", "FT_CLIENT_SECRET", "LBA_API_KEY", "WTTJ_APP_ID"):
+    os.environ.setdefault(name, "bench")
+os.environ.setdefault("WTTJ_API_KEY", "bench")
+os.environ.setdefault("BIGQUERY_TABLE_ID", "bench.jobnexus.jobs")
+
+PARIS = {"longitude": 2.3522, "latitude": 48.8566, "radius": 30, "insee": "75056"}
+
+# every search below uses a query no earlier request used, so it is a cache miss
+_queries = itertools.count()
+
+
+@dataclass(frozen=True)
+class Scenario:
+    path: str
+    params: Callable[[], dict]
+    stream: bool = False
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    # cache miss: ROME, the three providers, Firestore write, BigQuery ingestion
+    "search": Scenario(
+        "/search", lambda: {"q": f"développeur {next(_queries)}", **PARIS}
+    ),
+    # L1 hit after the warm-up request
+    "search_cached": Scenario("/search", lambda: {"q": "développeur", **PARIS}),
+    "search_stream": Scenario(
+        "/search/stream",
+        lambda: {"q": f"développeur {next(_queries)}", **PARIS},
+        stream=True,
+    ),
+    # dashboard pull, a BigQuery query each time
+    "opportunities": Scenario(
+        "/opportunities", lambda: {"q": f"data {next(_queries)}", "limit": 1000}
+    ),
+}
+
+
+def build_app(profiles, results: int):
+    """
+    The JobNexus app with its services wired to the stand-ins.
+    """
+    import dependencies as dp
+    from config import get_settings
+    from main import app
+    from services.http import HttpClientPool
+
+    settings = get_settings()
+    http_pool = HttpClientPool(
+        transport=httpx.MockTransport(ProviderStubs(profiles, results))
+    )
+    with (
+        patch(
+            "services.cache.firestore.AsyncClient",
+            return_value=FakeFirestore(profiles["firestore"]),
+        ),
+        patch(
+            "services.data.bigquery.Client",
+            return_value=FakeBigQuery(profiles["bigquery"]),
+        ),
+        patch("services.data.bigquery_storage.BigQueryReadClient"),
+    ):
+        cache_service = dp.get_cache_service(settings)
+        data_service = dp.get_data_service()
+        # built now so that the lifespan drains it at shutdown
+        ingestion_queue = dp.get_ingestion_queue()
+
+    app.dependency_overrides.update(
+        {
+            dp.get_http_pool: lambda: http_pool,
+            dp.get_cache_service: lambda: cache_service,
+            dp.get_data_service: lambda: data_service,
+            dp.get_ingestion_queue: lambda: ingestion_queue,
+        }
+    )
+    return app
+
+
+async def _request(client: httpx.AsyncClient, scenario: Scenario) -> dict:
+    started = perf_counter()
+    first_byte, ok = None, False
+    try:
+        async with client.stream(
+            "GET", scenario.path, params=scenario.params()
+        ) as response:
+            async for _ in response.aiter_raw():
+                if first_byte is None:
+                    first_byte = perf_counter() - started
+            ok = response.is_success
+    except httpx.HTTPError:
+        pass
+    latency = perf_counter() - started
+    return {"latency": latency, "first_byte": first_byte or latency, "ok": ok}
+
+
+async def run_level(
+    client: httpx.AsyncClient, scenario: Scenario, concurrency: int, requests: int
+) -> dict:
+    pending = iter(range(requests))
+    samples: List[dict] = []
+
+    async def worker():
+        for _ in pending:
+            samples.append(await _request(client, scenario))
+
+    started = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = perf_counter() - started
+
+    latencies = [sample["latency"] * 1000 for sample in samples]
+    stats = {
+        "requests": requests,
+        "errors": sum(1 for sample in samples if not sample["ok"]),
+        "throughput_rps": round(requests / elapsed, 1),
+        **_percentiles("latency", latencies),
+    }
+    if scenario.stream:
+        first_bytes = [sample["first_byte"] * 1000 for sample in samples]
+        stats.update(_percentiles("first_byte", first_bytes))
+    return stats
+
+
+def _percentiles(name: str, values: List[float]) -> dict:
+    if len(values) < 2:
+        values = values * 2
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        f"{name}_p50_ms": round(cuts[49], 1),
+        f"{name}_p95_ms": round(cuts[94], 1),
+        f"{name}_p99_ms": round(cuts[98], 1),
+    }
+
+
+async def run_allocations(
+    client: httpx.AsyncClient, scenario: Scenario, concurrency: int, requests: int
+) -> dict:
+    # the load generator shares the process, its own allocations are included
+    tracemalloc.start()
+    try:
+        await run_level(client, scenario, concurrency, requests)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"concurrency": concurrency, "peak_kib": round(peak / 1024)}
+
+
+async def run(args) -> dict:
+    profiles = load_profile(args.profile)
+    app = build_app(profiles, args.results)
+
+    config = uvicorn.Config(
+        app, host="127.0.0.1", port=0, log_level="warning", access_log=False
+    )
+    server = uvicorn.Server(config)
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    report = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "profile": args.profile,
+            "results_per_provider": args.results,
+            "requests": args.requests,
+            "python": platform.python_version(),
+        },
+        "scenarios": {},
+    }
+
+    limits = httpx.Limits(max_connections=max(levels))
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60
+    ) as client:
+        for name in args.scenarios.split(","):
+            scenario = SCENARIOS[name]
+            await _request(client, scenario)  # warm-up
+            levels_report = {}
+            for level in levels:
+                stats = await run_level(client, scenario, level, args.requests)
+                levels_report[str(level)] = stats
+                print(f"{name:>16} c={level:<4} {_summary(stats)}")
+            allocations = await run_allocations(
+                client, scenario, max(levels), min(args.requests, 50)
+            )
+            report["scenarios"][name] = {
+                "levels": levels_report,
+                "allocations": allocations,
+            }
+
+    server.should_exit = True
+    await serving
+    return report
+
+
+def _summary(stats: dict) -> str:
+    return (
+        f"p50 {stats['latency_p50_ms']:>8} ms  p95 {stats['latency_p95_ms']:>8} ms  "
+        f"p99 {stats['latency_p99_ms']:>8} ms  {stats['throughput_rps']:>7} req/s  "
+        f"{stats['errors']} errors"
+    )
+
+
+def compare(report: dict, baseline: dict):
+    """
+    Print the change of every figure found in both runs, in percent.
+    """
+    for name, scenario in report["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        for level, stats in scenario["levels"].items():
+            before = previous["levels"].get(level)
+            if before is None:
+                continue
+            changes = [
+                f"{key} {_change(before[key], value)}"
+                for key, value in stats.items()
+                if key.endswith(("_ms", "_rps")) and before.get(key)
+            ]
+            print(f"{name:>16} c={level:<4} " + "  ".join(changes))
+
+
+def _change(before: float, after: float) -> str:
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--profile", default="realistic")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,10,50")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--results", type=int, default=150)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    args = parser.parse_args(argv)
+
+    # the upstream stand-ins log every call at INFO
+    logging.disable(logging.INFO)
+    report = asyncio.run(run(args))
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-{Path(args.profile).stem}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        compare(report, json.loads(args.baseline.read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
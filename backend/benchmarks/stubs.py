@@ -0,0 +1,325 @@
+"""
+Local stand-ins for every upstream JobNexus calls: the providers answer through
+an httpx.MockTransport, Firestore and BigQuery through in-memory fakes. Each
+upstream follows a Profile (latency, jitter, error rate).
+"""
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import httpx
+import pyarrow
+
+UPSTREAMS = ("oauth", "rome", "wttj", "apec", "lba", "firestore", "bigquery")
+
+
+@dataclass(frozen=True)
+class Profile:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+    def delay(self) -> float:
+        spread = random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, self.latency_ms + spread) / 1000
+
+    def fails(self) -> bool:
+        return random.random() < self.error_rate
+
+
+def _uniform(profile: Profile) -> Dict[str, Profile]:
+    return {name: profile for name in UPSTREAMS}
+
+
+# latencies in the range seen from Cloud Run in europe-west1
+PROFILES: Dict[str, Dict[str, Profile]] = {
+    # no upstream cost at all: what is left is JobNexus itself
+    "instant": _uniform(Profile()),
+    "realistic": {
+        "oauth": Profile(120, 30),
+        "rome": Profile(150, 50),
+        "wttj": Profile(120, 40),
+        "apec": Profile(250, 100),
+        "lba": Profile(400, 150),
+        "firestore": Profile(15, 5),
+        "bigquery": Profile(900, 300),
+    },
+    "flaky": {
+        "oauth": Profile(120, 30, 0.05),
+        "rome": Profile(150, 50, 0.05),
+        "wttj": Profile(150, 100, 0.1),
+        "apec": Profile(400, 300, 0.2),
+        "lba": Profile(600, 400, 0.2),
+        "firestore": Profile(25, 15, 0.01),
+        "bigquery": Profile(1500, 800, 0.05),
+    },
+}
+
+
+def load_profile(name_or_path: str) -> Dict[str, Profile]:
+    """
+    A named profile, or a JSON file mapping upstreams to Profile fields;
+    upstreams left out of the file cost nothing.
+    """
+    if name_or_path in PROFILES:
+        return PROFILES[name_or_path]
+    with open(name_or_path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {name: Profile(**data.get(name, {})) for name in UPSTREAMS}
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class ProviderStubs:
+    """
+    httpx.MockTransport handler answering as the France Travail OAuth and ROME
+    APIs, Algolia (WTTJ), APEC and La Bonne Alternance. Each search gets
+    `results` offers per provider, the same ones for the same query.
+    """
+
+    def __init__(self, profiles: Dict[str, Profile], results: int = 150):
+        self.profiles = profiles
+        self.results = results
+        self.calls: Dict[str, int] = {}
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if host.endswith("algolia.net"):
+            upstream, handler = "wttj", self._wttj
+        elif host == "www.apec.fr":
+            upstream, handler = "apec", self._apec
+        elif host.startswith("labonnealternance"):
+            upstream, handler = "lba", self._lba
+        elif host == "entreprise.francetravail.fr":
+            upstream, handler = "oauth", self._oauth
+        elif host == "api.francetravail.io":
+            upstream, handler = "rome", self._rome
+        else:
+            return httpx.Response(404)
+
+        self.calls[upstream] = self.calls.get(upstream, 0) + 1
+        profile = self.profiles[upstream]
+        await asyncio.sleep(profile.delay())
+        if profile.fails():
+            return httpx.Response(503, request=request)
+        return handler(request)
+
+    def _oauth(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"access_token": "token", "expires_in": 1499})
+
+    def _rome(self, request: httpx.Request) -> httpx.Response:
+        query = request.url.params.get("q", "")
+        results = [
+            {"libelle": f"{query} {i}", "metier": {"code": f"M18{i:02d}"}}
+            for i in range(3)
+        ]
+        return httpx.Response(
+            200, json={"totalResultats": len(results), "resultats": results}
+        )
+
+    def _wttj(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        size, page = body["hitsPerPage"], body["page"]
+        latitude, longitude = map(float, body["aroundLatLng"].split(","))
+        hits = [
+            {
+                "name": f"{body['query']} {i}",
+                "slug": f"offer-{i}",
+                "organization": {"name": f"Company {i % 40}", "slug": f"c{i % 40}"},
+                "offices": [{"city": "Paris"}],
+                "_geoloc": {"lat": latitude + i * 1e-4, "lng": longitude},
+            }
+            for i in range(page * size, min((page + 1) * size, self.results))
+        ]
+        return httpx.Response(200, json={"hits": hits, "nbHits": self.results})
+
+    def _apec(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "GET":
+            # session page
+            return httpx.Response(200, text="<html></html>")
+
+        body = json.loads(request.content)
+        start, size = body["pagination"]["startIndex"], body["pagination"]["range"]
+        results = [
+            {
+                "intitule": f"{body['motsCles']} cadre {i}",
+                "nomCommercial": f"Groupe {i % 30}",
+                "lieuTexte": "Paris - 75",
+                "numeroOffre": f"{i}W",
+            }
+            for i in range(start, min(start + size, self.results))
+        ]
+        return httpx.Response(
+            200, json={"resultats": results, "totalCount": self.results}
+        )
+
+    def _lba(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        latitude, longitude = float(params["latitude"]), float(params["longitude"])
+        romes = params["romes"]
+        place = {"city": "Paris", "latitude": latitude, "longitude": longitude}
+
+        pe_jobs = [
+            {
+                "title": f"{romes} alternance {i}",
+                "url": f"https://candidat.francetravail.fr/offres/{i}",
+                "company": {"name": f"Entreprise {i % 25}", "place": place},
+                "target_diploma_level": "BTS, DEUG (Bac+2)",
+            }
+            for i in range(self.results // 2)
+        ]
+        matchas = [
+            {
+                "id": f"m{i}",
+                "title": f"{romes} apprenti {i}",
+                "company": {"name": f"PME {i % 25}"},
+                "place": place,
+                "job": {"contractType": "Apprentissage"},
+                "target_diploma_level": "Licence (Bac+3)",
+            }
+            for i in range(self.results - self.results // 2)
+        ]
+        return httpx.Response(
+            200,
+            json={"peJobs": {"results": pe_jobs}, "matchas": {"results": matchas}},
+        )
+
+
+class FakeFirestore:
+    """
+    Enough of firestore.AsyncClient for CacheService and RomeService.
+    """
+
+    def __init__(self, profile: Profile):
+        self.profile = profile
+        self.documents: Dict[str, dict] = {}
+
+    def collection(self, name: str) -> "_Collection":
+        return _Collection(self, name)
+
+    async def _call(self):
+        await asyncio.sleep(self.profile.delay())
+        if self.profile.fails():
+            raise UpstreamError("Firestore unavailable")
+
+
+class _Collection:
+    def __init__(self, db: FakeFirestore, name: str):
+        self.db = db
+        self.name = name
+
+    def document(self, doc_id: str) -> "_Document":
+        return _Document(self.db, f"{self.name}/{doc_id}")
+
+
+class _Document:
+    def __init__(self, db: FakeFirestore, path: str):
+        self.db = db
+        self.path = path
+
+    async def get(self) -> "_Snapshot":
+        await self.db._call()
+        return _Snapshot(self.db.documents.get(self.path))
+
+    async def set(self, data: dict):
+        await self.db._call()
+        self.db.documents[self.path] = data
+
+
+class _Snapshot:
+    def __init__(self, data: Optional[dict]):
+        self.exists = data is not None
+        self.data = data
+
+    def to_dict(self) -> Optional[dict]:
+        return self.data
+
+
+class FakeBigQuery:
+    """
+    Enough of bigquery.Client for DataService: the MERGE is accepted, the
+    opportunity queries return `limit` rows and the stats query one row.
+    Calls block like the real client, DataService runs them in a thread.
+    """
+
+    def __init__(self, profile: Profile):
+        self.profile = profile
+        self.jobs = 0
+
+    def query(self, query: str, job_config=None) -> "_QueryJob":
+        self.jobs += 1
+        parameters = {
+            parameter.name: getattr(parameter, "value", None)
+            for parameter in getattr(job_config, "query_parameters", [])
+        }
+        return _QueryJob(self, query, parameters, f"bench-{self.jobs}")
+
+
+class _QueryJob:
+    total_bytes_processed = 0
+    slot_millis = 0
+
+    def __init__(self, client: FakeBigQuery, query: str, parameters: dict, job_id):
+        self.client = client
+        self.query = query
+        self.parameters = parameters
+        self.job_id = job_id
+
+    def result(self):
+        time.sleep(self.client.profile.delay())
+        if self.client.profile.fails():
+            raise UpstreamError("BigQuery job failed")
+        if "MERGE" in self.query:
+            return _Rows(pyarrow.table({}))
+        if "top_recruiter" in self.query:
+            return _Rows(None, [self._stats_row()])
+        return _Rows(self._opportunities())
+
+    def _opportunities(self) -> pyarrow.Table:
+        query = self.parameters["search_query"]
+        count = self.parameters["limit"]
+        newest = datetime.now(timezone.utc)
+        return pyarrow.table(
+            {
+                "title": [f"{query} {i}" for i in range(count)],
+                "company": [f"Company {i % 40}" for i in range(count)],
+                "city": ["Paris"] * count,
+                "url": [f"https://example.com/jobs/{i}" for i in range(count)],
+                "contract_type": ["Alternance"] * count,
+                "target_diploma_level": ["Inconnu"] * count,
+                "source": [("WTTJ", "APEC", "LBA")[i % 3] for i in range(count)],
+                "scraped_at": [newest - timedelta(minutes=i) for i in range(count)],
+                "job_hash": [f"{count - i:064x}" for i in range(count)],
+            }
+        )
+
+    def _stats_row(self) -> dict:
+        today = date.today()
+        return {
+            "total": 1200,
+            "sources": 3,
+            "top_recruiter": "Company 1",
+            "top_city": "Paris",
+            "daily": [
+                {"day": today - timedelta(days=d), "count": 10} for d in range(120)
+            ],
+        }
+
+
+class _Rows:
+    def __init__(self, table: Optional[pyarrow.Table], rows: Optional[list] = None):
+        self.table = table
+        self.rows = rows or []
+
+    def to_arrow(self, bqstorage_client=None) -> pyarrow.Table:
+        return self.table
+
+    def __iter__(self):
+        return iter(self.rows)
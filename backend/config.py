@@ -1,14 +1,64 @@
 from functools import lru_cache
+from typing import Tuple
 
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from models.warmup import WarmTarget
 
 
 class Settings(BaseSettings):
+    # frozen makes Settings hashable so lru_cache'd dependencies can take it
+    model_config = SettingsConfigDict(frozen=True)
+
     ft_client_id: str
     ft_client_secret: str
     lba_api_key: str
     wttj_app_id: str
     wttj_api_key: str
+    http_keepalive_expiry: float = 30.0
+    cache_l1_max_size: int = 512
+    cache_l1_ttl_seconds: float = 300
+    cache_soft_ttl_seconds: float = 86400
+    cache_hard_ttl_seconds: float = 259200
+    cache_partial_ttl_seconds: float = 900
+    # wider radii (km) a cache miss may be served from, e.g. [50, 100]
+    cache_fallback_radii: Tuple[int, ...] = ()
+    # also write the plain job list, for a rollback to revisions that only
+    # read it; leave off otherwise, it doubles the size of every document
+    cache_write_legacy_jobs: bool = False
+    search_budget_seconds: float = 10.0
+    wttj_timeout_seconds: float = 8.0
+    apec_timeout_seconds: float = 8.0
+    lba_timeout_seconds: float = 8.0
+    wttj_max_results: int = 150
+    apec_max_results: int = 150
+    provider_page_concurrency: int = 3
+    apec_session_ttl_seconds: float = 1800
+    circuit_window_size: int = 20
+    circuit_failure_rate: float = 0.5
+    circuit_slow_call_seconds: float = 5.0
+    circuit_open_seconds: float = 30.0
+    provider_max_retries: int = 1
+    retry_budget_ratio: float = 0.1
+    # searches kept warm by /cache/warm, as JSON in WARM_TARGETS
+    warm_targets: Tuple[WarmTarget, ...] = ()
+    warm_ahead_seconds: float = 25200
+    warm_concurrency: int = 2
+    warm_wttj_rate_per_second: float = 2.0
+    warm_apec_rate_per_second: float = 1.0
+    warm_lba_rate_per_second: float = 2.0
+    ingestion_batch_size: int = 500
+    ingestion_flush_interval_seconds: float = 30.0
+    rome_cache_ttl_seconds: float = 604800
+    rome_cache_persist: bool = False
+    opportunities_cache_max_size: int = 256
+    opportunities_cache_ttl_seconds: float = 60
+    opportunities_stats_ttl_seconds: float = 300
+    # OTLP/HTTP collector base URL, metrics stay on /metrics only when empty
+    otlp_endpoint: str = ""
+    otlp_trace_sample_ratio: float = 0.1
+    # bearer token for /metrics, which answers 404 when empty
+    metrics_token: str = ""
 
 
 @lru_cache()
@@ -6,42 +6,125 @@ from config import Settings, get_settings
 from services.apec import ApecService
 from services.cache import CacheService
 from services.data import DataService
+from services.http import HttpClientPool
+from services.ingestion import IngestionQueue
 from services.labonnealternance import LaBonneAlternanceService
 from services.orchestrator import OrchestratorService
+from services.resilience import CircuitBreaker, RetryBudget
 from services.rome import RomeService
+from services.warmer import CacheWarmer
 from services.wttj import WelcomeService
 
 
 @lru_cache()
-def get_rome_service(settings: Settings = Depends(get_settings)):
-    return RomeService(settings.ft_client_id, settings.ft_client_secret)
+def get_http_pool():
+    settings = get_settings()
+    return HttpClientPool(keepalive_expiry=settings.http_keepalive_expiry)
 
 
 @lru_cache()
-def get_lba_service(settings: Settings = Depends(get_settings)):
-    return LaBonneAlternanceService(settings.lba_api_key)
+def get_rome_service(
+    settings: Settings = Depends(get_settings),
+    http_pool: HttpClientPool = Depends(get_http_pool),
+):
+    return RomeService(
+        settings.ft_client_id,
+        settings.ft_client_secret,
+        http_pool.get_client("rome"),
+        cache_ttl=settings.rome_cache_ttl_seconds,
+        persist=settings.rome_cache_persist,
+    )
 
 
 @lru_cache()
-def get_wttj_service(settings: Settings = Depends(get_settings)):
-    return WelcomeService(settings.wttj_app_id, settings.wttj_api_key)
+def get_lba_service(
+    settings: Settings = Depends(get_settings),
+    http_pool: HttpClientPool = Depends(get_http_pool),
+):
+    return LaBonneAlternanceService(settings.lba_api_key, http_pool.get_client("lba"))
+
+
+@lru_cache()
+def get_wttj_service(
+    settings: Settings = Depends(get_settings),
+    http_pool: HttpClientPool = Depends(get_http_pool),
+):
+    return WelcomeService(
+        settings.wttj_app_id,
+        settings.wttj_api_key,
+        http_pool.get_client("wttj"),
+        max_results=settings.wttj_max_results,
+        page_concurrency=settings.provider_page_concurrency,
+    )
 
 
 @lru_cache()
-def get_cache_service():
-    return CacheService()
+def get_cache_service(settings: Settings = Depends(get_settings)):
+    return CacheService(
+        l1_max_size=settings.cache_l1_max_size,
+        l1_ttl=settings.cache_l1_ttl_seconds,
+        soft_ttl=settings.cache_soft_ttl_seconds,
+        hard_ttl=settings.cache_hard_ttl_seconds,
+        partial_ttl=settings.cache_partial_ttl_seconds,
+        fallback_radii=settings.cache_fallback_radii,
+        write_legacy_jobs=settings.cache_write_legacy_jobs,
+    )
 
 
 @lru_cache()
-def get_apec_service():
-    return ApecService()
+def get_apec_service(
+    settings: Settings = Depends(get_settings),
+    http_pool: HttpClientPool = Depends(get_http_pool),
+):
+    return ApecService(
+        http_pool.get_client("apec"),
+        max_results=settings.apec_max_results,
+        page_concurrency=settings.provider_page_concurrency,
+        session_ttl=settings.apec_session_ttl_seconds,
+    )
 
 
 @lru_cache()
 def get_data_service():
-    return DataService()
+    settings = get_settings()
+    return DataService(
+        page_cache_size=settings.opportunities_cache_max_size,
+        page_cache_ttl=settings.opportunities_cache_ttl_seconds,
+        stats_cache_ttl=settings.opportunities_stats_ttl_seconds,
+    )
+
+
+@lru_cache()
+def get_ingestion_queue():
+    settings = get_settings()
+    return IngestionQueue(
+        get_data_service(),
+        max_batch_size=settings.ingestion_batch_size,
+        flush_interval=settings.ingestion_flush_interval_seconds,
+    )
+
+
+@lru_cache()
+def get_persist_tasks():
+    # the cache and BigQuery writes of answered searches, awaited at shutdown
+    return set()
+
+
+@lru_cache()
+def get_circuit_breakers():
+    settings = get_settings()
+    return {
+        name: CircuitBreaker(
+            window_size=settings.circuit_window_size,
+            failure_rate=settings.circuit_failure_rate,
+            slow_call_seconds=settings.circuit_slow_call_seconds,
+            open_seconds=settings.circuit_open_seconds,
+        )
+        for name in ("wttj", "apec", "lba")
+    }
 
 
+@lru_cache()
 def get_orchestrator_service(
     lba_service: LaBonneAlternanceService = Depends(get_lba_service),
     rome_service: RomeService = Depends(get_rome_service),
@@ -49,6 +132,8 @@ def get_orchestrator_service(
     cache_service: CacheService = Depends(get_cache_service),
     apec_service: ApecService = Depends(get_apec_service),
     data_service: DataService = Depends(get_data_service),
+    ingestion_queue: IngestionQueue = Depends(get_ingestion_queue),
+    settings: Settings = Depends(get_settings),
 ):
     return OrchestratorService(
         lba_service,
@@ -57,4 +142,34 @@ def get_orchestrator_service(
         cache_service,
         apec_service,
         data_service,
+        search_budget=settings.search_budget_seconds,
+        provider_timeouts={
+            "wttj": settings.wttj_timeout_seconds,
+            "apec": settings.apec_timeout_seconds,
+            "lba": settings.lba_timeout_seconds,
+        },
+        ingestion_queue=ingestion_queue,
+        # shared with /health, which reports their state
+        breakers=get_circuit_breakers(),
+        retry_budget=RetryBudget(ratio=settings.retry_budget_ratio),
+        max_retries=settings.provider_max_retries,
+        persisting=get_persist_tasks(),
+    )
+
+
+@lru_cache()
+def get_cache_warmer(
+    orchestrator_service: OrchestratorService = Depends(get_orchestrator_service),
+    settings: Settings = Depends(get_settings),
+):
+    return CacheWarmer(
+        orchestrator_service,
+        settings.warm_targets,
+        ahead=settings.warm_ahead_seconds,
+        concurrency=settings.warm_concurrency,
+        provider_rates={
+            "wttj": settings.warm_wttj_rate_per_second,
+            "apec": settings.warm_apec_rate_per_second,
+            "lba": settings.warm_lba_rate_per_second,
+        },
     )
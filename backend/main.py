@@ -1,16 +1,34 @@
+import asyncio
 import logging
+import secrets
 import sys
 import traceback
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Literal, Optional
 
 import google.cloud.logging
-from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException
+from fastapi import (
+    BackgroundTasks,
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
 
 import dependencies as dp
+from config import Settings, get_settings
 from services.apec import ApecService
+from services.cache import CacheService
 from services.data import DataService
 from services.labonnealternance import LaBonneAlternanceService
 from services.orchestrator import OrchestratorService
+from services.responses import FastJSONResponse, dumps
 from services.rome import RomeService
+from services.telemetry import render_metrics, setup_telemetry, shutdown_telemetry
+from services.warmer import CacheWarmer
 from services.wttj import WelcomeService
 
 logging.basicConfig(
@@ -25,7 +43,25 @@ try:
 except Exception as e:
     logging.warning(f"Failed to activate Cloud Logging: {str(e)}")
 
-app = FastAPI(title="JobNexus")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    setup_telemetry(settings.otlp_endpoint, settings.otlp_trace_sample_ratio)
+    # open the provider connection pools once and share them across requests
+    http_pool = dp.get_http_pool()
+    yield
+    # finish the writes of searches already answered, their rows included,
+    # then write the BigQuery rows still buffered before the instance goes away
+    if dp.get_persist_tasks.cache_info().currsize:
+        await asyncio.gather(*dp.get_persist_tasks())
+    if dp.get_ingestion_queue.cache_info().currsize:
+        await dp.get_ingestion_queue().close()
+    await http_pool.aclose()
+    shutdown_telemetry()
+
+
+app = FastAPI(title="JobNexus", lifespan=lifespan)
 
 
 @app.get("/")
@@ -35,11 +71,46 @@ def read_root():
 
 @app.get("/health")
 def read_health():
-    return {"status": "healthy"}
+    status = "healthy"
+    providers = {}
+    if dp.get_circuit_breakers.cache_info().currsize:
+        # no search has run yet otherwise
+        for name, breaker in dp.get_circuit_breakers().items():
+            providers[name] = breaker.snapshot()
+            if breaker.state != "closed":
+                status = "degraded"
+    return {"status": status, "providers": providers}
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics(
+    authorization: str = Header(""),
+    settings: Settings = Depends(get_settings),
+):
+    # the service is public and the figures are per instance, so scraping is
+    # opt-in; deployments push them over OTLP instead
+    if not settings.metrics_token:
+        raise HTTPException(status_code=404)
+    if not secrets.compare_digest(authorization, f"Bearer {settings.metrics_token}"):
+        raise HTTPException(status_code=401)
+    content, media_type = render_metrics()
+    return Response(content, media_type=media_type)
+
+
+@app.get("/cache/stats")
+def get_cache_stats(cache_service: CacheService = Depends(dp.get_cache_service)):
+    return cache_service.get_stats()
+
 
+@app.post("/cache/warm")
+async def warm_cache(cache_warmer: CacheWarmer = Depends(dp.get_cache_warmer)):
+    results = await cache_warmer.run()
+    return {"count": len(results), "results": results}
 
-@app.get("/lba")
+
+@app.get("/lba", response_class=FastJSONResponse)
 async def get_jobs_by_lba(
+    request: Request,
     longitude: float,
     latitude: float,
     radius: int,
@@ -49,7 +120,7 @@ async def get_jobs_by_lba(
 ):
     jobs = await lba_service.search_jobs(longitude, latitude, radius, insee, romes)
 
-    return {"count": len(jobs), "results": jobs}
+    return FastJSONResponse({"count": len(jobs), "results": jobs}, request)
 
 
 @app.get("/rome")
@@ -61,8 +132,9 @@ async def get_rome_codes(
     return {"count": len(codes), "results": codes}
 
 
-@app.get("/search")
+@app.get("/search", response_class=FastJSONResponse)
 async def get_jobs_by_query(
+    request: Request,
     background_tasks: BackgroundTasks,
     q: str,
     longitude: float,
@@ -72,19 +144,56 @@ async def get_jobs_by_query(
     orchestrator_service: OrchestratorService = Depends(dp.get_orchestrator_service),
 ):
     try:
-        jobs = await orchestrator_service.find_jobs_by_query(
+        result = await orchestrator_service.find_jobs_by_query(
             q, longitude, latitude, radius, insee, background_tasks
         )
 
-        return {"count": len(jobs), "results": jobs}
+        return FastJSONResponse(
+            {
+                "count": len(result.jobs),
+                "results": result.rows(),
+                "cached": result.cached,
+                "partial": result.partial,
+                "sources": result.sources,
+            },
+            request,
+        )
     except Exception as e:
         logging.error(f"Critical error: {str(e)}")
         logging.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/wttj")
+@app.get("/search/stream")
+async def stream_jobs_by_query(
+    background_tasks: BackgroundTasks,
+    q: str,
+    longitude: float,
+    latitude: float,
+    radius: int,
+    insee: str,
+    orchestrator_service: OrchestratorService = Depends(dp.get_orchestrator_service),
+):
+    events = orchestrator_service.stream_jobs_by_query(
+        q, longitude, latitude, radius, insee, background_tasks
+    )
+    return StreamingResponse(_to_ndjson(events), media_type="application/x-ndjson")
+
+
+async def _to_ndjson(events: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    try:
+        async for event in events:
+            yield dumps(event) + b"\n"
+    except Exception as e:
+        # the status line is already sent, so report the failure in-band
+        logging.error(f"Critical error: {str(e)}")
+        logging.error(traceback.format_exc())
+        yield dumps({"event": "error", "detail": str(e)}) + b"\n"
+
+
+@app.get("/wttj", response_class=FastJSONResponse)
 async def get_jobs_by_wttj(
+    request: Request,
     q: str,
     latitude: float,
     longitude: float,
@@ -93,24 +202,67 @@ async def get_jobs_by_wttj(
 ):
     wttj_jobs = await wttj_service.search_jobs(q, latitude, longitude, radius)
 
-    return {"count": len(wttj_jobs), "results": wttj_jobs}
+    return FastJSONResponse({"count": len(wttj_jobs), "results": wttj_jobs}, request)
 
 
-@app.get("/apec")
+@app.get("/apec", response_class=FastJSONResponse)
 async def get_jobs_by_apec(
-    q: str, insee: str, apec_service: ApecService = Depends(dp.get_apec_service)
+    request: Request,
+    q: str,
+    insee: str,
+    apec_service: ApecService = Depends(dp.get_apec_service),
 ):
     apec_jobs = await apec_service.search_jobs(q, insee)
 
-    return {"count": len(apec_jobs), "results": apec_jobs}
+    return FastJSONResponse({"count": len(apec_jobs), "results": apec_jobs}, request)
+
+
+@app.get("/opportunities/stats")
+async def get_opportunity_stats(
+    q: str, data_service: DataService = Depends(dp.get_data_service)
+):
+    return await asyncio.to_thread(data_service.get_opportunity_stats, q)
 
 
-@app.get("/opportunities")
-def get_opportunities(
+@app.get("/opportunities", response_class=FastJSONResponse)
+async def get_opportunities(
+    request: Request,
     q: str,
     limit: int = 50,
     skip: int = 0,
+    page_token: Optional[str] = None,
+    format: Literal["rows", "columns"] = "rows",
     data_service: DataService = Depends(dp.get_data_service),
 ):
-    jobs = data_service.get_opportunities(search_query=q, limit=limit, offset=skip)
-    return {"count": len(jobs), "results": jobs}
+    if page_token:
+        try:
+            data_service.decode_page_token(page_token)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # the BigQuery client blocks, keep it off the event loop
+    if format == "columns":
+        columns, next_page_token = await asyncio.to_thread(
+            data_service.get_opportunities_columns,
+            search_query=q,
+            limit=limit,
+            offset=skip,
+            page_token=page_token,
+        )
+        count = len(next(iter(columns.values()), []))
+        return FastJSONResponse(
+            {"count": count, "columns": columns, "next_page_token": next_page_token},
+            request,
+        )
+
+    jobs, next_page_token = await asyncio.to_thread(
+        data_service.get_opportunities,
+        search_query=q,
+        limit=limit,
+        offset=skip,
+        page_token=page_token,
+    )
+    return FastJSONResponse(
+        {"count": len(jobs), "results": jobs, "next_page_token": next_page_token},
+        request,
+    )
@@ -1,6 +1,9 @@
-from typing import Optional
+import logging
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+logger = logging.getLogger(__name__)
 
 
 class Job(BaseModel):
@@ -12,3 +15,34 @@ class Job(BaseModel):
     contract_type: Optional[str] = "Alternance"
     target_diploma_level: str
     source: str
+    # every provider listing this offer, filled when results are deduplicated
+    sources: List[str] = []
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+# validates and dumps whole pages of jobs in one call into pydantic-core
+JOB_LIST = TypeAdapter(List[Job])
+
+
+def validate_jobs(rows: List[dict]) -> List[Job]:
+    """
+    Build jobs from provider rows in one pass. If a row is invalid, the rows
+    are validated one by one so that only the invalid ones are dropped.
+    """
+    try:
+        return JOB_LIST.validate_python(rows)
+    except ValidationError:
+        pass
+
+    jobs = []
+    for row in rows:
+        try:
+            jobs.append(Job.model_validate(row))
+        except ValidationError as e:
+            logger.warning(f"Skipping invalid job: {e}")
+    return jobs
+
+
+def dump_jobs(jobs: List[Job]) -> List[dict]:
+    return JOB_LIST.dump_python(jobs)
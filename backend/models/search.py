@@ -0,0 +1,38 @@
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, PrivateAttr, model_validator
+
+from models.job import Job, dump_jobs
+
+
+class SourceStatus(BaseModel):
+    status: Literal["ok", "timeout", "error", "skipped", "circuit_open"]
+    elapsed_ms: float
+    count: int = 0
+
+
+class SearchResult(BaseModel):
+    jobs: List[Job]
+    sources: Dict[str, SourceStatus] = {}
+    cached: bool = False
+    # true when a source timed out, failed or was cut off by its breaker;
+    # given explicitly for cached results, whose sources may not be stored
+    partial: bool = False
+    _rows: Optional[List[dict]] = PrivateAttr(default=None)
+
+    def rows(self) -> List[dict]:
+        """
+        The jobs dumped once, shared by the response and BigQuery ingestion.
+        """
+        if self._rows is None:
+            self._rows = dump_jobs(self.jobs)
+        return self._rows
+
+    @model_validator(mode="after")
+    def _partial_from_sources(self) -> "SearchResult":
+        if any(
+            source.status in ("timeout", "error", "circuit_open")
+            for source in self.sources.values()
+        ):
+            self.partial = True
+        return self
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, ConfigDict
+
+
+class WarmTarget(BaseModel):
+    # frozen so Settings, which lists them, stays hashable
+    model_config = ConfigDict(frozen=True)
+
+    query: str
+    latitude: float
+    longitude: float
+    radius: int
+    insee: str
@@ -1,13 +1,80 @@
+import asyncio
 import logging
-from typing import List
+from time import time
+from typing import AsyncIterator, List, Tuple
+from urllib.parse import quote
 
 import httpx
 
-from models.job import Job
+from models.job import Job, validate_jobs
+from services.pagination import iter_pages
+from services.telemetry import stage
+
+# largest page the search form asks for
+PAGE_SIZE = 50
+
+
+class ApecSession:
+    """
+    The APEC search API expects the cookies its home page hands out. They
+    live in the cookie jar of the long-lived client and the home page is
+    only visited again when they expire or a search is refused.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, headers: dict, ttl: float = 1800):
+        self.client = client
+        self.headers = headers
+        self.ttl = ttl
+        self.expires_at = 0.0
+        # bumped on every refresh, so callers refused with an older session
+        # do not refresh it again
+        self.generation = 0
+        self.lock = asyncio.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    async def ensure(self):
+        if time() < self.expires_at:
+            return
+        await self.refresh(self.generation)
+
+    async def refresh(self, generation: int):
+        """
+        Renew the session unless it was renewed since `generation`.
+        """
+        async with self.lock:
+            if generation != self.generation and time() < self.expires_at:
+                return
+
+            with stage("provider.request", provider="apec_session"):
+                response = await self.client.get(
+                    "https://www.apec.fr", headers=self.headers
+                )
+            self.generation += 1
+            if response.is_error:
+                # the search is still attempted, as without a session
+                self.logger.warning(f"APEC session refresh: {response.status_code}")
+                self.expires_at = 0.0
+                return
+
+            deadlines = [
+                cookie.expires
+                for cookie in self.client.cookies.jar
+                if cookie.domain.endswith("apec.fr") and cookie.expires
+            ]
+            self.expires_at = min([time() + self.ttl, *deadlines])
 
 
 class ApecService:
-    def __init__(self):
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        max_results: int = 150,
+        page_concurrency: int = 3,
+        session_ttl: float = 1800,
+    ):
+        self.client = client
+        self.max_results = max_results
+        self.page_concurrency = page_concurrency
         self.headers = {
             "Host": "www.apec.fr",
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:145.0) "
@@ -22,6 +89,7 @@ class ApecService:
             "Sec-Fetch-Site": "same-origin",
         }
         self.url = "https://www.apec.fr/cms/webservices/rechercheOffre"
+        self.session = ApecSession(client, self.headers, ttl=session_ttl)
         self.base_payload = {
             "lieux": [],
             "fonctions": [],
@@ -44,40 +112,79 @@ class ApecService:
         self.logger = logging.getLogger(__name__)
 
     async def search_jobs(self, query: str, insee: str) -> List[Job]:
+        try:
+            return await self.fetch_jobs(query, insee)
+        except Exception as e:
+            self.logger.error(f"APEC failed: {str(e)}", exc_info=True)
+            return []
+
+    async def fetch_jobs(self, query: str, insee: str) -> List[Job]:
+        """
+        Same as search_jobs, but lets provider errors propagate to the caller.
+        """
+        jobs = []
+        async for page in self.iter_jobs(query, insee):
+            jobs.extend(page)
+        return jobs
+
+    async def iter_jobs(self, query: str, insee: str) -> AsyncIterator[List[Job]]:
+        """
+        Yield up to `max_results` jobs page by page, as the pages arrive.
+        """
+        await self.session.ensure()
+
+        page_size = min(PAGE_SIZE, self.max_results)
+        pages = iter_pages(
+            lambda page: self._fetch_page(query, insee, page, page_size),
+            page_size,
+            self.max_results,
+            self.page_concurrency,
+        )
+        async for jobs in pages:
+            yield jobs
+
+    async def _fetch_page(
+        self, query: str, insee: str, page: int, page_size: int
+    ) -> Tuple[List[Job], int]:
         code_dep = insee[:2]
 
         payload = self.base_payload.copy()
         payload["lieux"] = [code_dep]
         payload["motsCles"] = query
+        payload["pagination"] = {"range": page_size, "startIndex": page * page_size}
 
         search_headers = {
-            "Referer": f"https://www.apec.fr/candidat/recherche-emploi.html/emploi?typesContrat=20053&motsCles={query}&lieux={code_dep}"
+            **self.headers,
+            "Referer": f"https://www.apec.fr/candidat/recherche-emploi.html/emploi?typesContrat=20053&motsCles={quote(query)}&lieux={code_dep}",
         }
 
-        try:
-            async with httpx.AsyncClient(headers=self.headers) as client:
-                await client.get("https://www.apec.fr")
-
-                response = await client.post(
+        generation = self.session.generation
+        with stage("provider.request", provider="apec"):
+            response = await self.client.post(
+                url=self.url, json=payload, headers=search_headers
+            )
+        if response.status_code in (401, 403):
+            await self.session.refresh(generation)
+            with stage("provider.request", provider="apec"):
+                response = await self.client.post(
                     url=self.url, json=payload, headers=search_headers
                 )
 
-            response.raise_for_status()
-            data = response.json()
-        except Exception as e:
-            self.logger.error(f"APEC failed: {str(e)}", exc_info=True)
-            return []
+        response.raise_for_status()
+        data = response.json()
 
         resultats = data.get("resultats", [])
-        jobs = []
+        rows = []
         for result in resultats:
-            job = Job(
-                title=result["intitule"],
-                company=result["nomCommercial"],
-                city=result["lieuTexte"],
-                url=f"https://www.apec.fr/candidat/recherche-emploi.html/emploi/detail-offre/{result['numeroOffre']}",
-                target_diploma_level="Inconnu",
-                source="APEC",
+            rows.append(
+                {
+                    "title": result["intitule"],
+                    "company": result["nomCommercial"],
+                    "city": result["lieuTexte"],
+                    "url": f"https://www.apec.fr/candidat/recherche-emploi.html/emploi/detail-offre/{result['numeroOffre']}",
+                    "target_diploma_level": "Inconnu",
+                    "source": "APEC",
+                }
             )
-            jobs.append(job)
-        return jobs
+        jobs = validate_jobs(rows)
+        return jobs, data.get("totalCount", len(jobs))
@@ -1,52 +1,227 @@
 import hashlib
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from typing import List
+from typing import Dict, List, Optional, Sequence
 
 from google.cloud import firestore
 
-from models.job import Job
+from models.job import Job, dump_jobs
+from models.search import SourceStatus
+from services.cache_codec import decode_jobs, encode_jobs
+from services.geo import distance_km, geohash, precision_for_radius
+from services.memory_cache import MemoryCache
+from services.telemetry import CACHE_LOOKUPS, stage
+from services.text import city_key, normalize_text
+
+
+@dataclass
+class CacheEntry:
+    jobs: List[Job]
+    refresh_at: datetime
+    expire_at: datetime
+    # whether the search missed a provider, and how each one answered
+    partial: bool = False
+    sources: Dict[str, SourceStatus] = field(default_factory=dict)
+
+    @property
+    def is_stale(self) -> bool:
+        return datetime.now(timezone.utc) >= self.refresh_at
 
 
 class CacheService:
-    def __init__(self):
+    """
+    Two-tier search cache: an in-process LRU (L1) in front of Firestore (L2).
+    L1 entries never outlive the `expire_at` of the Firestore document they mirror.
+
+    Entries are fresh until `refresh_at` (soft TTL) and may still be served, as
+    stale, until `expire_at` (hard TTL), which is also the Firestore TTL field.
+
+    Searches are keyed by normalized query and by a geohash cell sized after
+    the radius, so nearby searches share an entry. With `fallback_radii`, a
+    miss may be served from a search at least twice as wide, keeping only
+    the offers within the requested radius.
+
+    Jobs are stored as a compact blob. With `write_legacy_jobs` they are also
+    stored as the plain list revisions before the blob read, so that those
+    can be rolled back to.
+    """
+
+    def __init__(
+        self,
+        l1_max_size: int = 512,
+        l1_ttl: float = 300,
+        soft_ttl: float = 86400,
+        hard_ttl: float = 259200,
+        partial_ttl: float = 900,
+        fallback_radii: Sequence[int] = (),
+        write_legacy_jobs: bool = False,
+    ):
         self.db = firestore.AsyncClient()
         self.collection_name = "job_searches"
+        self.soft_ttl = timedelta(seconds=soft_ttl)
+        self.hard_ttl = timedelta(seconds=max(hard_ttl, soft_ttl))
+        self.partial_ttl = timedelta(seconds=min(partial_ttl, soft_ttl))
+        self.l1 = MemoryCache(max_size=l1_max_size, ttl=l1_ttl)
+        self.fallback_radii = sorted(fallback_radii)
+        self.write_legacy_jobs = write_legacy_jobs
+        self.l2_hits = 0
+        self.l2_misses = 0
 
     def _generate_cache_key(
         self, query: str, lat: float, lon: float, radius: int
     ) -> str:
-        raw = f"{query}_{lat:.4f}_{lon:.4f}_{radius}"
+        cell = geohash(lat, lon, precision_for_radius(radius))
+        raw = f"{normalize_text(query)}_{cell}_{radius}"
         return hashlib.md5(raw.encode("utf-8")).hexdigest()
 
     async def save_jobs(
-        self, query: str, lat: float, lon: float, radius: int, jobs: List[Job]
+        self,
+        query: str,
+        lat: float,
+        lon: float,
+        radius: int,
+        jobs: List[Job],
+        partial: bool = False,
+        sources: Optional[Dict[str, SourceStatus]] = None,
     ):
+        sources = sources or {}
         research_date = datetime.now(timezone.utc)
-        expire_at = research_date + timedelta(days=1)
+        # results missing a provider are refreshed sooner than complete ones
+        soft_ttl = self.partial_ttl if partial else self.soft_ttl
+        refresh_at = research_date + soft_ttl
+        expire_at = research_date + self.hard_ttl
         cache_key = self._generate_cache_key(query, lat, lon, radius)
-        jobs_data = [job.model_dump() for job in jobs]
         document_content = {
+            "refresh_at": refresh_at,
             "expire_at": expire_at,
             "params": {"query": query, "lat": lat, "lon": lon, "radius": radius},
-            "jobs": jobs_data,
+            "partial": partial,
+            "sources": {name: status.model_dump() for name, status in sources.items()},
         }
-        await self.db.collection(self.collection_name).document(cache_key).set(
-            document_content
-        )
+        with stage("serialize", kind="cache_encode"):
+            document_content["jobs_blob"] = encode_jobs(jobs)
+            if self.write_legacy_jobs:
+                document_content["jobs"] = dump_jobs(jobs)
+        with stage("cache.write", tier="firestore"):
+            await self.db.collection(self.collection_name).document(cache_key).set(
+                document_content
+            )
+        entry = CacheEntry(list(jobs), refresh_at, expire_at, partial, dict(sources))
+        self.l1.set(cache_key, entry, expire_at.timestamp())
 
     async def get_jobs(
         self, query: str, lat: float, lon: float, radius: int
     ) -> List[Job] | None:
-        cache_key = self._generate_cache_key(query, lat, lon, radius)
+        entry = await self.get_entry(query, lat, lon, radius)
+        if entry is None:
+            return None
+        return list(entry.jobs)
+
+    async def get_entry(
+        self, query: str, lat: float, lon: float, radius: int
+    ) -> CacheEntry | None:
+        """
+        Return the cached search, fresh or stale, or None past the hard TTL.
+        """
+        entry = await self._get_entry(self._generate_cache_key(query, lat, lon, radius))
+        if entry is not None:
+            return entry
+
+        for wider in self.fallback_radii:
+            # the wider search was centered somewhere in its own cell, it only
+            # covers this one if it reaches well beyond the requested radius
+            if wider < 2 * radius:
+                continue
+            entry = await self._get_entry(
+                self._generate_cache_key(query, lat, lon, wider)
+            )
+            if entry is not None:
+                jobs = _within(entry.jobs, lat, lon, radius)
+                return CacheEntry(
+                    jobs,
+                    entry.refresh_at,
+                    entry.expire_at,
+                    entry.partial,
+                    entry.sources,
+                )
+
+        return None
+
+    async def _get_entry(self, cache_key: str) -> CacheEntry | None:
+        local_entry = self.l1.get(cache_key)
+        if local_entry is not None:
+            CACHE_LOOKUPS.add(1, {"tier": "memory", "result": "hit"})
+            return local_entry
+        CACHE_LOOKUPS.add(1, {"tier": "memory", "result": "miss"})
+
         doc_ref = self.db.collection(self.collection_name).document(cache_key)
-        doc_snapshot = await doc_ref.get()
+        with stage("cache.read", tier="firestore"):
+            doc_snapshot = await doc_ref.get()
         if not doc_snapshot.exists:
+            self.l2_misses += 1
+            CACHE_LOOKUPS.add(1, {"tier": "firestore", "result": "miss"})
             return None
         data = doc_snapshot.to_dict()
         current_date = datetime.now(timezone.utc)
         cached_date = data["expire_at"]
         time_since_exp = current_date - cached_date
         if time_since_exp.total_seconds() > 0:
+            self.l2_misses += 1
+            CACHE_LOOKUPS.add(1, {"tier": "firestore", "result": "expired"})
             return None
-        jobs_dicts = data.get("jobs", [])
-        return [Job.model_validate(j) for j in jobs_dicts]
+        self.l2_hits += 1
+        CACHE_LOOKUPS.add(1, {"tier": "firestore", "result": "hit"})
+        with stage("serialize", kind="cache_decode"):
+            if "jobs_blob" in data:
+                jobs = decode_jobs(data["jobs_blob"])
+            else:
+                # documents written before the compact encoding
+                jobs = [Job.model_validate(j) for j in data.get("jobs", [])]
+        # documents written before the soft TTL existed are fresh until expiry
+        refresh_at = data.get("refresh_at", cached_date)
+        # documents written before the statuses were stored have neither
+        sources = {
+            name: SourceStatus.model_validate(status)
+            for name, status in data.get("sources", {}).items()
+        }
+        entry = CacheEntry(
+            jobs, refresh_at, cached_date, data.get("partial", False), sources
+        )
+        self.l1.set(cache_key, entry, cached_date.timestamp())
+        return entry
+
+    def get_stats(self) -> dict:
+        return {
+            "l1": self.l1.stats(),
+            "l2": {"hits": self.l2_hits, "misses": self.l2_misses},
+        }
+
+
+def _within(jobs: List[Job], lat: float, lon: float, radius: int) -> List[Job]:
+    """
+    The jobs placed within `radius` km, and the jobs without coordinates, like
+    every APEC offer, in a city one of those is in.
+    """
+    distances = [
+        (
+            None
+            if job.latitude is None or job.longitude is None
+            else distance_km(lat, lon, job.latitude, job.longitude)
+        )
+        for job in jobs
+    ]
+    cities = {
+        city_key(job.city)
+        for job, distance in zip(jobs, distances)
+        if distance is not None and distance <= radius
+    }
+    cities.discard("")
+
+    kept = []
+    for job, distance in zip(jobs, distances):
+        if distance is None:
+            if city_key(job.city) in cities:
+                kept.append(job)
+        elif distance <= radius:
+            kept.append(job)
+    return kept
@@ -0,0 +1,92 @@
+import json
+import zlib
+from typing import Dict, List, Optional
+
+from models.job import Job
+
+# bump when the layout changes, decode_jobs refuses versions it does not know
+VERSION = 1
+
+
+class _Strings:
+    """
+    String table: every distinct value is stored once and referenced by index.
+    """
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def ref(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.values)
+            self.values.append(value)
+        return position
+
+
+def encode_jobs(jobs: List[Job]) -> bytes:
+    """
+    Pack jobs column by column into a compressed blob.
+
+    String columns ("Inconnu", "Alternance", sources, companies...) hold
+    indexes into a shared string table, URLs are split so that their common
+    prefix is stored once, and other columns are kept as plain JSON values.
+    """
+    strings = _Strings()
+    columns = {}
+
+    for name in Job.model_fields:
+        values = [getattr(job, name) for job in jobs]
+        if name == "url":
+            prefixes, suffixes = [], []
+            for url in values:
+                prefix, _, suffix = url.rpartition("/")
+                prefixes.append(strings.ref(prefix + "/" if prefix else ""))
+                suffixes.append(suffix)
+            columns[name] = {"p": prefixes, "v": suffixes}
+        elif all(value is None or isinstance(value, str) for value in values):
+            columns[name] = {"i": [strings.ref(value) for value in values]}
+        else:
+            columns[name] = {"v": values}
+
+    payload = {
+        "version": VERSION,
+        "count": len(jobs),
+        "strings": strings.values,
+        "columns": columns,
+    }
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    return zlib.compress(raw.encode("utf-8"))
+
+
+def decode_jobs(blob: bytes) -> List[Job]:
+    """
+    Unpack encode_jobs output. The blob is our own, so jobs are built without
+    validation.
+    """
+    payload = json.loads(zlib.decompress(blob))
+    if payload["version"] != VERSION:
+        raise ValueError(f"Unknown cache blob version {payload['version']}")
+
+    strings = payload["strings"]
+    columns = {}
+    for name, column in payload["columns"].items():
+        if name not in Job.model_fields:
+            continue
+        if "p" in column:
+            columns[name] = [
+                strings[prefix] + suffix
+                for prefix, suffix in zip(column["p"], column["v"])
+            ]
+        elif "i" in column:
+            columns[name] = [None if i < 0 else strings[i] for i in column["i"]]
+        else:
+            columns[name] = column["v"]
+
+    return [
+        Job.model_construct(**{name: values[row] for name, values in columns.items()})
+        for row in range(payload["count"])
+    ]
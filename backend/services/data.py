@@ -1,38 +1,87 @@
+import base64
+import binascii
 import hashlib
 import json
+import logging
 import os
 from datetime import datetime, timezone
-from typing import List
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urlparse, urlunparse
 
-from google.cloud import bigquery
+import pyarrow
+from google.cloud import bigquery, bigquery_storage
 
-from models.job import Job
+from models.job import Job, dump_jobs
+from services.memory_cache import MemoryCache
+from services.telemetry import stage
+from services.text import normalize_text
+
+# opportunities older than this are no longer listed
+OPPORTUNITY_WINDOW_DAYS = 120
+
+# placeholders some providers use instead of the recruiter's name
+HIDDEN_COMPANIES = ["Entreprise confidentielle", "Confidentiel"]
 
 
 class DataService:
-    def __init__(self):
+    def __init__(
+        self,
+        page_cache_size: int = 256,
+        page_cache_ttl: float = 60,
+        stats_cache_ttl: float = 300,
+    ):
         self.client = bigquery.Client()
+        self.read_client = bigquery_storage.BigQueryReadClient()
         self.table_id = os.getenv("BIGQUERY_TABLE_ID")
         if not self.table_id:
             raise ValueError("Environment variable BIGQUERY_TABLE_ID is not set")
+        # the dashboard asks for the same few categories over and over
+        self.pages = MemoryCache(max_size=page_cache_size, ttl=page_cache_ttl)
+        self.stats = MemoryCache(max_size=page_cache_size, ttl=stats_cache_ttl)
+        self.logger = logging.getLogger(__name__)
 
     def generate_job_hash(self, job: Job) -> str:
-        parsed = urlparse(job.url)
+        return self._hash(job.title, job.company, job.url)
+
+    def _hash(self, title: str, company: str, url: str) -> str:
+        parsed = urlparse(url)
         clean_url = urlunparse(
             (parsed.scheme, parsed.netloc, parsed.path, parsed.params, "", "")
         )
-        raw_string = f"{job.title}{job.company}{clean_url}".lower()
+        raw_string = f"{title}{company}{clean_url}".lower()
         return hashlib.sha256(raw_string.encode("utf-8")).hexdigest()
 
     def get_job_dict(self, job: Job) -> dict:
-        job_dict = job.model_dump() if hasattr(job, "model_dump") else job.dict()
-        job_dict["scraped_at"] = datetime.now(timezone.utc).isoformat()
-        job_dict["job_hash"] = self.generate_job_hash(job)
-        return job_dict
+        return self.get_job_rows([job.model_dump()])[0]
+
+    def get_job_rows(self, jobs: List[dict]) -> List[dict]:
+        """
+        Table rows for jobs already dumped (see models.job.dump_jobs). The
+        dumped dicts are copied, not modified.
+        """
+        scraped_at = datetime.now(timezone.utc).isoformat()
+        return [
+            {
+                **job,
+                "scraped_at": scraped_at,
+                "job_hash": self._hash(job["title"], job["company"], job["url"]),
+            }
+            for job in jobs
+        ]
 
     def save_jobs_data(self, jobs: List[Job]):
+        if not jobs:
+            return
+
+        self.save_rows(self.get_job_rows(dump_jobs(jobs)))
+
+    def save_rows(self, rows: List[dict]):
         """
+        MERGE rows built by get_job_dict into the table, skipping hashes stored
+        within the listing window.
+        This blocks until the DML job finishes: call it from a worker thread.
+
         Reference:
         - MERGE Syntax: https://cloud.google.com/bigquery/docs/reference/standard-sql/dml-syntax#merge_statement
         - Query Parameters: https://cloud.google.com/bigquery/docs/parameterized-queries#array_parameters
@@ -40,11 +89,10 @@ class DataService:
         - Working With Arrays: https://docs.cloud.google.com/bigquery/docs/arrays
 
         """
-        if not jobs:
+        if not rows:
             return
 
-        rows_to_insert = [self.get_job_dict(job) for job in jobs]
-        jobs_json_string = json.dumps(rows_to_insert, default=str)
+        jobs_json_string = json.dumps(rows, default=str)
 
         query = f"""
         MERGE `{self.table_id}` T
@@ -62,7 +110,12 @@ class DataService:
             TIMESTAMP(JSON_VALUE(item, '$.scraped_at')) as scraped_at
           FROM UNNEST(JSON_EXTRACT_ARRAY(@json_data)) AS item
         ) S
+        -- only recent partitions of the target are scanned: an offer seen
+        -- again after the window is no longer listed and is stored anew
         ON T.job_hash = S.job_hash
+        AND T.scraped_at >= TIMESTAMP_SUB(
+            CURRENT_TIMESTAMP(), INTERVAL {OPPORTUNITY_WINDOW_DAYS} DAY
+        )
         WHEN NOT MATCHED THEN
           INSERT (
               search_query, job_hash, title, company, city, url,
@@ -80,46 +133,209 @@ class DataService:
             ]
         )
 
-        query_job = self.client.query(query, job_config=job_config)
-        query_job.result()
+        self._run_query("merge", query, job_config)
 
     def get_opportunities(
-        self, search_query: str, limit: int = 50, offset: int = 0
-    ) -> List[dict]:
+        self,
+        search_query: str,
+        limit: int = 50,
+        offset: int = 0,
+        page_token: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Return a page of rows, newest first, and the token of the next page
+        (None on the last page).
+        """
+        table = self._get_page(search_query, limit, offset, page_token)
+        return table.to_pylist(), self._next_page_token(table, limit)
+
+    def get_opportunities_columns(
+        self,
+        search_query: str,
+        limit: int = 50,
+        offset: int = 0,
+        page_token: Optional[str] = None,
+    ) -> Tuple[Dict[str, list], Optional[str]]:
+        """
+        Same page as get_opportunities, as one list per column.
+        """
+        table = self._get_page(search_query, limit, offset, page_token)
+        return table.to_pydict(), self._next_page_token(table, limit)
+
+    @staticmethod
+    def encode_page_token(scraped_at: datetime, job_hash: str) -> str:
+        payload = json.dumps({"t": scraped_at.isoformat(), "h": job_hash})
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_page_token(page_token: str) -> Tuple[datetime, str]:
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(page_token.encode("ascii")))
+            return datetime.fromisoformat(payload["t"]), str(payload["h"])
+        except binascii.Error, UnicodeError, ValueError, TypeError, KeyError:
+            raise ValueError("Invalid page token")
+
+    def _next_page_token(self, table: pyarrow.Table, limit: int) -> Optional[str]:
+        if table.num_rows == 0 or table.num_rows < limit:
+            return None
+        last = table.num_rows - 1
+        return self.encode_page_token(
+            table.column("scraped_at")[last].as_py(),
+            table.column("job_hash")[last].as_py(),
+        )
+
+    def _get_page(
+        self,
+        search_query: str,
+        limit: int,
+        offset: int,
+        page_token: Optional[str],
+    ) -> pyarrow.Table:
+        cursor = self.decode_page_token(page_token) if page_token else None
+        # rows are tagged with the normalized query
+        search_query = normalize_text(search_query)
+
+        key = json.dumps([search_query, limit, offset, page_token])
+        table = self.pages.get(key)
+        if table is None:
+            table = self._query_opportunities(search_query, limit, offset, cursor)
+            self.pages.set(key, table)
+        return table
+
+    def _query_opportunities(
+        self,
+        search_query: str,
+        limit: int,
+        offset: int = 0,
+        cursor: Optional[Tuple[datetime, str]] = None,
+    ) -> pyarrow.Table:
+        """
+        Pages are read by keyset on (scraped_at, job_hash): a cursor resumes
+        right after the last row of the previous page, so BigQuery does not
+        sort and discard every row before it as it does for OFFSET.
+
+        Reference:
+        - Storage Read API: https://cloud.google.com/bigquery/docs/reference/storage
+        - QueryJob.to_arrow: https://cloud.google.com/python/docs/reference/bigquery/latest/google.cloud.bigquery.job.QueryJob
+
+        """
+        query_parameters = [
+            bigquery.ScalarQueryParameter("search_query", "STRING", search_query),
+            bigquery.ScalarQueryParameter("limit", "INT64", limit),
+            bigquery.ScalarQueryParameter("offset", "INT64", offset),
+        ]
+
+        keyset = ""
+        if cursor is not None:
+            keyset = """
+            AND (
+                scraped_at < @cursor_at
+                OR (scraped_at = @cursor_at AND job_hash < @cursor_hash)
+            )"""
+            query_parameters += [
+                bigquery.ScalarQueryParameter("cursor_at", "TIMESTAMP", cursor[0]),
+                bigquery.ScalarQueryParameter("cursor_hash", "STRING", cursor[1]),
+            ]
+
         query = f"""
             SELECT
                 title, company, city, url, contract_type,
-                target_diploma_level, source, scraped_at
+                target_diploma_level, source, scraped_at, job_hash
             FROM `{self.table_id}`
-            WHERE scraped_at >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 120 DAY)
-            AND search_query = @search_query
-            ORDER BY scraped_at DESC
+            WHERE scraped_at >= TIMESTAMP_SUB(
+                CURRENT_TIMESTAMP(), INTERVAL {OPPORTUNITY_WINDOW_DAYS} DAY
+            )
+            AND search_query = @search_query{keyset}
+            ORDER BY scraped_at DESC, job_hash DESC
             LIMIT @limit OFFSET @offset
         """
 
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+
+        rows = self._run_query("opportunities", query, job_config)
+
+        # large results are downloaded as Arrow record batches through the
+        # Storage Read API instead of paging JSON rows over REST
+        with stage("bigquery.download", query="opportunities"):
+            return rows.to_arrow(bqstorage_client=self.read_client)
+
+    def get_opportunity_stats(self, search_query: str) -> dict:
+        """
+        Market figures for one category, aggregated in BigQuery so the payload
+        does not grow with the table: total, top recruiter, top city, number of
+        sources and new opportunities per day.
+        """
+        search_query = normalize_text(search_query)
+        stats = self.stats.get(search_query)
+        if stats is None:
+            stats = self._query_opportunity_stats(search_query)
+            self.stats.set(search_query, stats)
+        return stats
+
+    def _query_opportunity_stats(self, search_query: str) -> dict:
+        query = f"""
+            WITH jobs AS (
+                SELECT company, city, source, DATE(scraped_at) AS day
+                FROM `{self.table_id}`
+                WHERE scraped_at >= TIMESTAMP_SUB(
+                    CURRENT_TIMESTAMP(), INTERVAL {OPPORTUNITY_WINDOW_DAYS} DAY
+                )
+                AND search_query = @search_query
+            )
+            SELECT
+                (SELECT COUNT(*) FROM jobs) AS total,
+                (SELECT COUNT(DISTINCT source) FROM jobs) AS sources,
+                (
+                    SELECT company FROM jobs
+                    WHERE company NOT IN UNNEST(@hidden_companies)
+                    GROUP BY company ORDER BY COUNT(*) DESC, company LIMIT 1
+                ) AS top_recruiter,
+                (
+                    SELECT city FROM jobs
+                    WHERE city IS NOT NULL
+                    GROUP BY city ORDER BY COUNT(*) DESC, city LIMIT 1
+                ) AS top_city,
+                ARRAY(
+                    SELECT AS STRUCT day, COUNT(*) AS count
+                    FROM jobs GROUP BY day ORDER BY day
+                ) AS daily
+        """
+
         job_config = bigquery.QueryJobConfig(
             query_parameters=[
                 bigquery.ScalarQueryParameter("search_query", "STRING", search_query),
-                bigquery.ScalarQueryParameter("limit", "INT64", limit),
-                bigquery.ScalarQueryParameter("offset", "INT64", offset),
+                bigquery.ArrayQueryParameter(
+                    "hidden_companies", "STRING", HIDDEN_COMPANIES
+                ),
             ]
         )
 
-        query_job = self.client.query(query, job_config=job_config)
-
-        results = []
-        for row in query_job:
-            results.append(
-                {
-                    "title": row.title,
-                    "company": row.company,
-                    "city": row.city,
-                    "url": row.url,
-                    "contract_type": row.contract_type,
-                    "target_diploma_level": row.target_diploma_level,
-                    "source": row.source,
-                    "scraped_at": row.scraped_at,
-                }
-            )
+        row = next(iter(self._run_query("stats", query, job_config)))
+        return {
+            "total": row["total"],
+            "sources": row["sources"],
+            "top_recruiter": row["top_recruiter"],
+            "top_city": row["top_city"],
+            "daily": [
+                {"day": item["day"].isoformat(), "count": item["count"]}
+                for item in row["daily"]
+            ],
+        }
 
-        return results
+    def _run_query(
+        self, name: str, query: str, job_config: bigquery.QueryJobConfig
+    ) -> bigquery.table.RowIterator:
+        """
+        Run a query to completion and log what it cost.
+        """
+        started = perf_counter()
+        with stage("bigquery", query=name):
+            query_job = self.client.query(query, job_config=job_config)
+            rows = query_job.result()
+        elapsed_ms = (perf_counter() - started) * 1000
+        self.logger.info(
+            f"BigQuery {name} job {query_job.job_id}: "
+            f"{query_job.total_bytes_processed} bytes processed, "
+            f"{query_job.slot_millis} slot ms, {elapsed_ms:.0f} ms"
+        )
+        return rows
@@ -0,0 +1,152 @@
+from typing import Dict, FrozenSet, List, Tuple
+
+from models.job import Job
+from services.data import HIDDEN_COMPANIES
+from services.text import TOKEN, city_key, normalize_text
+
+# words that do not tell two offers apart: gender markers, French stop words
+# and the contract type every result already shares
+TITLE_NOISE = {
+    "h",
+    "f",
+    "x",
+    "m",
+    "hf",
+    "fh",
+    "a",
+    "d",
+    "l",
+    "de",
+    "des",
+    "du",
+    "en",
+    "et",
+    "la",
+    "le",
+    "les",
+    "alternance",
+    "alternant",
+    "apprenti",
+    "apprentissage",
+}
+
+COMPANY_NOISE = {"sa", "sas", "sasu", "sarl", "eurl", "group", "groupe"}
+
+HIDDEN = {normalize_text(company) for company in HIDDEN_COMPANIES}
+
+
+def _tokens(text: str) -> List[str]:
+    return TOKEN.findall(normalize_text(text or ""))
+
+
+def _title_tokens(title: str) -> FrozenSet[str]:
+    return frozenset(t for t in _tokens(title) if t not in TITLE_NOISE)
+
+
+def _company_key(company: str) -> str:
+    return " ".join(t for t in _tokens(company) if t not in COMPANY_NOISE)
+
+
+def _richness(job: Job) -> Tuple[int, int]:
+    filled = sum(
+        1 for value in (job.city, job.contract_type, job.target_diploma_level) if value
+    )
+    return filled, len(job.title)
+
+
+def _similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    # a title made only of noise words says nothing about the offer
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _job_sources(job: Job) -> List[str]:
+    return job.sources or [job.source]
+
+
+class _Cluster:
+    def __init__(self, job: Job, tokens: FrozenSet[str]):
+        self.tokens = tokens
+        self.jobs = [job]
+        self.urls = {job.url}
+        self.sources = set(_job_sources(job))
+
+    def accepts(self, job: Job, tokens: FrozenSet[str], threshold: float) -> bool:
+        if job.url in self.urls:
+            return True
+        # distinct offers from one provider can share a company, a city and
+        # nearly a title: only an offer listed elsewhere is merged
+        if not self.sources.isdisjoint(_job_sources(job)):
+            return False
+        return _similarity(tokens, self.tokens) >= threshold
+
+    def add(self, job: Job):
+        self.jobs.append(job)
+        self.urls.add(job.url)
+        self.sources.update(_job_sources(job))
+
+    def merged(self) -> Job:
+        best = max(self.jobs, key=_richness)
+        sources = []
+        for job in self.jobs:
+            for source in _job_sources(job):
+                if source not in sources:
+                    sources.append(source)
+        return best.model_copy(update={"sources": sources})
+
+
+class JobDeduper:
+    """
+    Merge the same offer listed by several providers, as their pages come in.
+
+    Jobs are grouped by normalized company and city, then titles within a
+    group are compared as token sets (Jaccard similarity >= `threshold`).
+    Only jobs from different sources, or with the same URL, are merged.
+    Groups are small, so this stays linear in the number of jobs.
+    """
+
+    def __init__(self, threshold: float = 0.75):
+        self.threshold = threshold
+        self.blocks: Dict[Tuple[str, str], List[_Cluster]] = {}
+        self.clusters: List[_Cluster] = []
+
+    def add(self, jobs: List[Job]) -> List[Job]:
+        """
+        Add a page of jobs and return those not merged into an earlier one.
+        """
+        new_jobs = []
+        for job in jobs:
+            company = _company_key(job.company)
+            if not company or company in HIDDEN:
+                # anonymous offers cannot be told apart by their company
+                company = f"url:{job.url}"
+            block = self.blocks.setdefault((company, city_key(job.city)), [])
+
+            tokens = _title_tokens(job.title)
+            for cluster in block:
+                if cluster.accepts(job, tokens, self.threshold):
+                    cluster.add(job)
+                    break
+            else:
+                cluster = _Cluster(job, tokens)
+                block.append(cluster)
+                self.clusters.append(cluster)
+                new_jobs.append(job)
+        return new_jobs
+
+    def jobs(self) -> List[Job]:
+        """
+        One job per duplicate set, its most complete record with every source
+        that listed it in `sources`. Order follows the first occurrence.
+        """
+        return [cluster.merged() for cluster in self.clusters]
+
+
+def dedupe_jobs(jobs: List[Job], threshold: float = 0.75) -> List[Job]:
+    """
+    Merge the same offer listed by several providers, see JobDeduper.
+    """
+    deduper = JobDeduper(threshold)
+    deduper.add(jobs)
+    return deduper.jobs()
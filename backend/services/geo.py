@@ -0,0 +1,77 @@
+import math
+from typing import Any, Optional, Tuple
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# height and width (km, at the equator) of a geohash cell per precision
+CELL_SIZES_KM = {
+    1: (5000, 5000),
+    2: (625, 1250),
+    3: (156, 156),
+    4: (19.5, 39.1),
+    5: (4.89, 4.89),
+    6: (0.61, 1.22),
+    7: (0.153, 0.153),
+}
+
+# searches snapped to the same cell share results: keep the cell small next to
+# the search radius so snapping hardly changes which offers are in range
+CELL_RADIUS_RATIO = 0.2
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def geohash(latitude: float, longitude: float, precision: int) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True
+
+    while len(chars) < precision:
+        value, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+
+    return "".join(chars)
+
+
+def precision_for_radius(radius: float) -> int:
+    """
+    Coarsest precision whose cells are no larger than CELL_RADIUS_RATIO of
+    `radius` km, so that wider searches share larger cells.
+    """
+    limit = radius * CELL_RADIUS_RATIO
+    for precision in sorted(CELL_SIZES_KM):
+        if max(CELL_SIZES_KM[precision]) <= limit:
+            return precision
+    return max(CELL_SIZES_KM)
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def parse_coordinates(latitude: Any, longitude: Any) -> Tuple[Optional[float], ...]:
+    """
+    Provider coordinates as floats, or (None, None) when missing or invalid.
+    """
+    try:
+        return float(latitude), float(longitude)
+    except TypeError, ValueError:
+        return None, None
@@ -0,0 +1,59 @@
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+# Connection budget per upstream. Cloud Run serves up to 80 concurrent requests
+# per instance and every /search hits each provider once, so the pools are sized
+# around that. HTTP/2 multiplexes requests on a few connections where the
+# provider supports it; APEC is kept on HTTP/1.1 because it is called with
+# browser-like headers that are not valid under HTTP/2.
+PROVIDER_POOLS = {
+    "wttj": {"max_connections": 40, "max_keepalive_connections": 10, "http2": True},
+    "apec": {"max_connections": 80, "max_keepalive_connections": 40, "http2": False},
+    "lba": {"max_connections": 40, "max_keepalive_connections": 10, "http2": True},
+    "rome": {"max_connections": 20, "max_keepalive_connections": 5, "http2": True},
+}
+
+
+class HttpClientPool:
+    """
+    One client per provider. A `transport` replaces the network for every
+    client (benchmarks route the providers to local stand-ins this way), and
+    the pool limits no longer apply.
+    """
+
+    def __init__(
+        self,
+        keepalive_expiry: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.keepalive_expiry = keepalive_expiry
+        self.transport = transport
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+        self.logger = logging.getLogger(__name__)
+
+        for provider in PROVIDER_POOLS:
+            self.clients[provider] = self._build_client(provider)
+
+    def _build_client(self, provider: str) -> httpx.AsyncClient:
+        pool = PROVIDER_POOLS[provider]
+        limits = httpx.Limits(
+            max_connections=pool["max_connections"],
+            max_keepalive_connections=pool["max_keepalive_connections"],
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        return httpx.AsyncClient(
+            limits=limits, http2=pool["http2"], transport=self.transport
+        )
+
+    def get_client(self, provider: str) -> httpx.AsyncClient:
+        return self.clients[provider]
+
+    async def aclose(self):
+        for provider, client in self.clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                self.logger.error(f"Failed to close {provider} client: {e}")
+        self.clients.clear()
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from time import monotonic
+from typing import Dict, List, Optional
+
+from models.job import Job, dump_jobs
+from services.data import DataService
+from services.telemetry import stage
+
+
+class IngestionQueue:
+    """
+    Buffers job rows across requests and MERGEs them into BigQuery in batches.
+
+    Rows are deduplicated by job_hash while buffered. A batch is written as soon
+    as `max_batch_size` rows are waiting, or every `flush_interval` seconds
+    otherwise, from a worker thread so the event loop never waits on a DML job.
+
+    Cloud Run only allocates CPU while requests are in flight, so the timer may
+    stall between requests: searches also call flush_due after responding,
+    which writes the rows that have waited long enough within a request.
+    """
+
+    def __init__(
+        self,
+        data_service: DataService,
+        max_batch_size: int = 500,
+        flush_interval: float = 30.0,
+        max_buffer_size: int = 20000,
+    ):
+        self.data_service = data_service
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer_size = max_buffer_size
+        self.buffer: Dict[str, dict] = {}
+        self.worker: Optional[asyncio.Task] = None
+        self.wakeup = asyncio.Event()
+        self.flush_lock = asyncio.Lock()
+        self.closing = False
+        self.closed = False
+        # when the oldest buffered row was put, None while the buffer is empty
+        self.buffered_at: Optional[float] = None
+        self.flushed_rows = 0
+        self.flush_count = 0
+        self.dropped_rows = 0
+        self.logger = logging.getLogger(__name__)
+
+    def put(self, jobs: List[Job]):
+        self.put_rows(dump_jobs(jobs))
+
+    def put_rows(self, jobs: List[dict]):
+        """
+        Same as put, for jobs already dumped (see models.job.dump_jobs).
+        Rows put while the queue closes are written by close(), rows put once
+        it is closed raise, as nothing would write them.
+        """
+        if self.closed:
+            raise RuntimeError("The ingestion queue is closed")
+        for row in self.data_service.get_job_rows(jobs):
+            if row["job_hash"] in self.buffer:
+                continue
+            if len(self.buffer) >= self.max_buffer_size:
+                self.dropped_rows += 1
+                continue
+            self.buffer[row["job_hash"]] = row
+        if self.buffer and self.buffered_at is None:
+            self.buffered_at = monotonic()
+
+        if not self.closing and (self.worker is None or self.worker.done()):
+            self.worker = asyncio.create_task(self._run())
+        if len(self.buffer) >= self.max_batch_size:
+            self.wakeup.set()
+
+    async def _run(self):
+        while not self.closing:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+            except TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def flush_due(self):
+        """
+        Write the buffered rows if a batch is full or the oldest row has
+        waited `flush_interval` seconds.
+        """
+        if self.buffered_at is None:
+            return
+        waited = monotonic() - self.buffered_at
+        if len(self.buffer) >= self.max_batch_size or waited >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self):
+        async with self.flush_lock:
+            while self.buffer:
+                hashes = list(self.buffer)[: self.max_batch_size]
+                batch = [self.buffer.pop(job_hash) for job_hash in hashes]
+                try:
+                    with stage("background", task="ingestion_flush"):
+                        await asyncio.to_thread(self.data_service.save_rows, batch)
+                except asyncio.CancelledError:
+                    # the thread may still write them, MERGE skips known hashes
+                    for row in batch:
+                        self.buffer.setdefault(row["job_hash"], row)
+                    raise
+                except Exception as e:
+                    self.logger.error(
+                        f"Failed to ingest {len(batch)} rows: {e}", exc_info=True
+                    )
+                    # keep the rows for the next flush
+                    for row in batch:
+                        self.buffer.setdefault(row["job_hash"], row)
+                    return
+                self.flushed_rows += len(batch)
+                self.flush_count += 1
+            self.buffered_at = None
+
+    async def close(self):
+        """
+        Stop the worker once its current flush is written, then write whatever
+        is still buffered.
+        """
+        self.closing = True
+        self.wakeup.set()
+        if self.worker is not None:
+            await self.worker
+            self.worker = None
+        await self.flush()
+        self.closed = True
+
+    def stats(self) -> dict:
+        return {
+            "buffered_rows": len(self.buffer),
+            "flushed_rows": self.flushed_rows,
+            "flush_count": self.flush_count,
+            "dropped_rows": self.dropped_rows,
+        }
@@ -3,19 +3,33 @@ from typing import Any, Dict, List, Optional
 
 import httpx
 
-from models.job import Job
+from models.job import Job, validate_jobs
+from services.geo import parse_coordinates
+from services.telemetry import stage
 
 
 class LaBonneAlternanceService:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, client: httpx.AsyncClient):
         self.api_key = api_key
+        self.client = client
         self.url = "https://labonnealternance.apprentissage.beta.gouv.fr/api/v1/jobs"
         self.logger = logging.getLogger(__name__)
 
     async def search_jobs(
         self, latitude: float, longitude: float, radius: int, insee: str, romes: str
     ) -> List[Job]:
+        try:
+            return await self.fetch_jobs(latitude, longitude, radius, insee, romes)
+        except Exception as e:
+            self.logger.error(f"LBA error: {e}", exc_info=True)
+            return []
 
+    async def fetch_jobs(
+        self, latitude: float, longitude: float, radius: int, insee: str, romes: str
+    ) -> List[Job]:
+        """
+        Same as search_jobs, but lets provider errors propagate to the caller.
+        """
         params = {
             "longitude": longitude,
             "latitude": latitude,
@@ -30,53 +44,59 @@ class LaBonneAlternanceService:
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
 
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.url, params=params, headers=headers)
+        with stage("provider.request", provider="lba"):
+            response = await self.client.get(self.url, params=params, headers=headers)
             response.raise_for_status()
-            data = response.json()
-        except Exception as e:
-            self.logger.error(f"LBA error: {e}", exc_info=True)
-            return []
+        data = response.json()
 
-        results = []
+        rows = []
 
         pe_raw = data.get("peJobs", {}).get("results", [])
         for item in pe_raw:
-            if job := self._parse_pe_job(item):
-                results.append(job)
+            if row := self._parse_pe_job(item):
+                rows.append(row)
 
         matcha_raw = data.get("matchas", {}).get("results", [])
         for item in matcha_raw:
-            if job := self._parse_matcha_job(item):
-                results.append(job)
+            if row := self._parse_matcha_job(item):
+                rows.append(row)
 
-        return results
+        return validate_jobs(rows)
 
-    def _parse_pe_job(self, item: Dict[str, Any]) -> Optional[Job]:
+    def _parse_pe_job(self, item: Dict[str, Any]) -> Optional[dict]:
         try:
             company = item.get("company") or {}
             place = company.get("place") or {}
+            # the offer's own place when given, else the company's
+            location = item.get("place") or place
+            latitude, longitude = parse_coordinates(
+                location.get("latitude"), location.get("longitude")
+            )
 
-            return Job(
-                title=item.get("title", "Titre Inconnu"),
-                company=company.get("name", "Entreprise confidentielle"),
-                city=place.get("city") or place.get("fullAddress"),
-                url=item.get("url", "#"),
-                contract_type="Alternance",
-                target_diploma_level=item.get("target_diploma_level")
+            return {
+                "title": item.get("title", "Titre Inconnu"),
+                "company": company.get("name", "Entreprise confidentielle"),
+                "city": place.get("city") or place.get("fullAddress"),
+                "url": item.get("url", "#"),
+                "contract_type": "Alternance",
+                "target_diploma_level": item.get("target_diploma_level")
                 or "Niveau d'études non précisé",
-                source="LBA",
-            )
+                "source": "LBA",
+                "latitude": latitude,
+                "longitude": longitude,
+            }
         except Exception as e:
             self.logger.error(f"Skipping PE job: {e}", exc_info=True)
             return None
 
-    def _parse_matcha_job(self, item: Dict[str, Any]) -> Optional[Job]:
+    def _parse_matcha_job(self, item: Dict[str, Any]) -> Optional[dict]:
         try:
             company = item.get("company") or {}
             place = item.get("place") or {}
             job_details = item.get("job") or {}
+            latitude, longitude = parse_coordinates(
+                place.get("latitude"), place.get("longitude")
+            )
 
             job_id = item.get("id")
 
@@ -89,15 +109,17 @@ class LaBonneAlternanceService:
             if not url:
                 url = "https://labonnealternance.apprentissage.beta.gouv.fr"
 
-            return Job(
-                title=item.get("title", "Titre Inconnu"),
-                company=company.get("name", "Entreprise confidentielle"),
-                city=place.get("city") or place.get("fullAddress"),
-                url=url,
-                contract_type=job_details.get("contractType", "Apprentissage"),
-                target_diploma_level=item.get("target_diploma_level"),
-                source="LBA",
-            )
+            return {
+                "title": item.get("title", "Titre Inconnu"),
+                "company": company.get("name", "Entreprise confidentielle"),
+                "city": place.get("city") or place.get("fullAddress"),
+                "url": url,
+                "contract_type": job_details.get("contractType", "Apprentissage"),
+                "target_diploma_level": item.get("target_diploma_level"),
+                "source": "LBA",
+                "latitude": latitude,
+                "longitude": longitude,
+            }
         except Exception as e:
             self.logger.error(f"Skipping Matcha job: {e}", exc_info=True)
             return None
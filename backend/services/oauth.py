@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from time import time
+from typing import Optional
+
+import httpx
+
+from services.singleflight import SingleFlight
+from services.telemetry import stage
+
+
+class OAuthToken:
+    """
+    Client-credentials access token shared by every request of a service.
+
+    The token is renewed in the background `refresh_margin` seconds before it
+    expires, on a timer set when it is fetched, while requests keep using it;
+    a failed renewal is retried every `retry_delay` seconds for as long as the
+    current token stays valid. Only when there is no valid token at all do
+    requests wait, and then on a single fetch.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        payload: dict,
+        refresh_margin: float = 300,
+        retry_delay: float = 5,
+    ):
+        self.client = client
+        self.url = url
+        self.payload = payload
+        self.refresh_margin = refresh_margin
+        self.retry_delay = retry_delay
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self.refresh_at = 0.0
+        self.inflight = SingleFlight()
+        self.refreshing: Optional[asyncio.Task] = None
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.logger = logging.getLogger(__name__)
+
+    async def get(self) -> str:
+        now = time()
+        if self.token is not None and now < self.expires_at:
+            if now >= self.refresh_at:
+                # the timer has not fired yet, e.g. the event loop was busy
+                self._start_refresh()
+            return self.token
+
+        return await self.inflight.do("token", self._fetch)
+
+    def _start_refresh(self):
+        if self.refreshing is None:
+            self.refreshing = asyncio.create_task(self._refresh())
+
+    async def _refresh(self):
+        try:
+            while True:
+                try:
+                    await self.inflight.do("token", self._fetch)
+                    return
+                except Exception as e:
+                    self.logger.error(f"OAuth token refresh error: {e}", exc_info=True)
+                if time() >= self.expires_at:
+                    # requests now fetch the token themselves
+                    return
+                await asyncio.sleep(self.retry_delay)
+        finally:
+            self.refreshing = None
+
+    async def _fetch(self) -> str:
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        with stage("provider.request", provider="oauth"):
+            response = await self.client.post(
+                self.url, data=self.payload, headers=headers
+            )
+            response.raise_for_status()
+        data = response.json()
+
+        expires_in = data["expires_in"]
+        self.token = data["access_token"]
+        self.expires_at = time() + expires_in
+        self.refresh_at = self.expires_at - min(self.refresh_margin, expires_in / 2)
+
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = asyncio.get_running_loop().call_later(
+            self.refresh_at - time(), self._start_refresh
+        )
+        return self.token
@@ -1,17 +1,29 @@
 import asyncio
 import logging
-from typing import List
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
 
 from fastapi import BackgroundTasks
 
 from models.job import Job
+from models.search import SearchResult, SourceStatus
 from services.apec import ApecService
 from services.cache import CacheService
 from services.data import DataService
+from services.dedupe import JobDeduper
+from services.ingestion import IngestionQueue
 from services.labonnealternance import LaBonneAlternanceService
+from services.resilience import CircuitBreaker, RetryBudget, backoff, is_retryable
 from services.rome import RomeService
+from services.singleflight import SingleFlight
+from services.telemetry import PROVIDER_RESULTS, record_stage, stage
+from services.text import normalize_text
 from services.wttj import WelcomeService
 
+# cancel message for providers still running when the search budget runs out
+BUDGET_SPENT = "search budget spent"
+
 
 class OrchestratorService:
     def __init__(
@@ -22,6 +34,13 @@ class OrchestratorService:
         cache_service: CacheService,
         apec_service: ApecService,
         data_service: DataService,
+        search_budget: float = 10.0,
+        provider_timeouts: Optional[Dict[str, float]] = None,
+        ingestion_queue: Optional[IngestionQueue] = None,
+        breakers: Optional[Dict[str, CircuitBreaker]] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        max_retries: int = 1,
+        persisting: Optional[Set[asyncio.Task]] = None,
     ):
         self.lba_service = lba_service
         self.rome_service = rome_service
@@ -29,6 +48,18 @@ class OrchestratorService:
         self.cache_service = cache_service
         self.apec_service = apec_service
         self.data_service = data_service
+        self.search_budget = search_budget
+        self.provider_timeouts = provider_timeouts or {}
+        self.ingestion_queue = ingestion_queue
+        self.breakers = breakers or {
+            name: CircuitBreaker() for name in ("wttj", "apec", "lba")
+        }
+        self.retry_budget = retry_budget or RetryBudget()
+        self.max_retries = max_retries
+        self.inflight = SingleFlight()
+        self.refreshing = set()
+        # cache and BigQuery writes still running, referenced until they finish
+        self.persisting = persisting if persisting is not None else set()
         self.logger = logging.getLogger(__name__)
 
     async def find_jobs_by_query(
@@ -39,54 +70,453 @@ class OrchestratorService:
         radius: int,
         insee: str,
         background_tasks: BackgroundTasks,
-    ) -> List[Job]:
-        cached_jobs = await self.cache_service.get_jobs(
+    ) -> SearchResult:
+        cache_key = self.cache_service._generate_cache_key(
             query, latitude, longitude, radius
         )
-        if cached_jobs is not None:
-            return cached_jobs
+        self._schedule_flush(background_tasks)
+
+        cached = await self._get_cached(
+            cache_key, query, longitude, latitude, radius, insee, background_tasks
+        )
+        if cached is not None:
+            return cached
 
-        romes = await self.rome_service.search_rome(query)
+        # identical concurrent misses share one fan-out and one set of writes
+        return await self.inflight.do(
+            cache_key,
+            lambda: self._search_and_store(
+                query, longitude, latitude, radius, insee, wait=False
+            ),
+        )
 
-        codes = [rome.code for rome in romes]
-        codes = ",".join(codes)
-        jobs = []
+    async def warm_cache(
+        self,
+        query: str,
+        longitude: float,
+        latitude: float,
+        radius: int,
+        insee: str,
+        ahead: float,
+    ) -> Optional[SearchResult]:
+        """
+        Search again and store the results if the cached search is missing or
+        due for a refresh within `ahead` seconds. Returns None when the cached
+        search is still fresh.
+        """
+        cached = await self.cache_service.get_entry(query, latitude, longitude, radius)
+        if cached is not None:
+            due_in = cached.refresh_at - datetime.now(timezone.utc)
+            if due_in.total_seconds() > ahead:
+                return None
+
+        cache_key = self.cache_service._generate_cache_key(
+            query, latitude, longitude, radius
+        )
+        return await self.inflight.do(
+            cache_key,
+            lambda: self._search_and_store(query, longitude, latitude, radius, insee),
+        )
+
+    async def stream_jobs_by_query(
+        self,
+        query: str,
+        longitude: float,
+        latitude: float,
+        radius: int,
+        insee: str,
+        background_tasks: BackgroundTasks,
+    ) -> AsyncIterator[dict]:
+        """
+        Same search as find_jobs_by_query, but yields a "jobs" event for each
+        page of results as soon as a provider returns it, a "status" event as
+        each provider finishes, then a final "summary" event.
+
+        Jobs already streamed for another provider are left out of later
+        pages, so the summary count is the number of jobs streamed.
+        """
+        cache_key = self.cache_service._generate_cache_key(
+            query, latitude, longitude, radius
+        )
+        self._schedule_flush(background_tasks)
 
-        searches = [
-            self.wttj_service.search_jobs(query, latitude, longitude, radius),
-            self.apec_service.search_jobs(query, insee),
+        cached = await self._get_cached(
+            cache_key, query, longitude, latitude, radius, insee, background_tasks
+        )
+        if cached is not None:
+            yield {"event": "jobs", "source": "cache", "results": cached.jobs}
+            yield self._summary_event(cached)
+            return
+
+        queue = asyncio.Queue()
+
+        async def fan_out():
+            try:
+                return await self._search_and_store(
+                    query,
+                    longitude,
+                    latitude,
+                    radius,
+                    insee,
+                    wait=False,
+                    on_result=queue.put_nowait,
+                )
+            finally:
+                queue.put_nowait(None)
+
+        task, started = self.inflight.start(cache_key, fan_out)
+
+        if started:
+            while (item := await queue.get()) is not None:
+                yield self._provider_event(*item)
+            result = await asyncio.shield(task)
+        else:
+            # another request is already searching this key, replay its results,
+            # each job under the first provider that listed it
+            result = await asyncio.shield(task)
+            by_source = {}
+            for job in result.jobs:
+                first = (job.sources or [job.source])[0].lower()
+                by_source.setdefault(first, []).append(job)
+            for name, status in result.sources.items():
+                jobs = by_source.get(name)
+                if jobs:
+                    yield self._provider_event(name, jobs, None)
+                yield self._provider_event(name, [], status)
+
+        yield self._summary_event(result)
+
+    async def _get_cached(
+        self,
+        cache_key: str,
+        query: str,
+        longitude: float,
+        latitude: float,
+        radius: int,
+        insee: str,
+        background_tasks: BackgroundTasks,
+    ) -> Optional[SearchResult]:
+        cached = await self.cache_service.get_entry(query, latitude, longitude, radius)
+        if cached is None:
+            return None
+
+        if cached.is_stale:
+            self._schedule_refresh(
+                cache_key, (query, longitude, latitude, radius, insee), background_tasks
+            )
+        return SearchResult(
+            jobs=cached.jobs,
+            sources=cached.sources,
+            cached=True,
+            partial=cached.partial,
+        )
+
+    def _provider_event(
+        self, name: str, jobs: List[Job], status: Optional[SourceStatus]
+    ) -> dict:
+        if status is None:
+            return {"event": "jobs", "source": name, "results": jobs}
+        return {"event": "status", "source": name, **status.model_dump()}
+
+    def _summary_event(self, result: SearchResult) -> dict:
+        return {
+            "event": "summary",
+            "count": len(result.jobs),
+            "cached": result.cached,
+            "partial": result.partial,
+            "sources": result.sources,
+        }
+
+    def _schedule_refresh(
+        self, cache_key: str, search: tuple, background_tasks: BackgroundTasks
+    ):
+        # serve stale results now and refresh them once, after the response
+        if cache_key in self.refreshing or self.inflight.is_running(cache_key):
+            return
+        self.refreshing.add(cache_key)
+        background_tasks.add_task(self._refresh, cache_key, *search)
+
+    def _schedule_flush(self, background_tasks: BackgroundTasks):
+        # write the BigQuery rows that are due while the request still holds
+        # the instance's CPU
+        if self.ingestion_queue is not None:
+            background_tasks.add_task(self.ingestion_queue.flush_due)
+
+    async def _refresh(self, cache_key, query, longitude, latitude, radius, insee):
+        try:
+            with stage("background", task="refresh"):
+                await self.inflight.do(
+                    cache_key,
+                    lambda: self._search_and_store(
+                        query, longitude, latitude, radius, insee
+                    ),
+                )
+        except Exception as e:
+            self.logger.error(f"Background refresh failed: {str(e)}", exc_info=True)
+        finally:
+            self.refreshing.discard(cache_key)
+
+    async def _search_and_store(
+        self,
+        query: str,
+        longitude: float,
+        latitude: float,
+        radius: int,
+        insee: str,
+        wait: bool = True,
+        on_result: Optional[Callable[[tuple], None]] = None,
+    ) -> SearchResult:
+        """
+        Fan out to the providers, then persist the results to the cache and
+        BigQuery. Without `wait`, the writes run in a task of their own, so
+        neither the response nor a caller disconnecting holds them up.
+        """
+        result = await self._search_providers(
+            query, longitude, latitude, radius, insee, on_result
+        )
+        persist = self._persist(query, latitude, longitude, radius, result)
+
+        if wait:
+            await persist
+        else:
+            task = asyncio.create_task(persist)
+            self.persisting.add(task)
+            task.add_done_callback(self.persisting.discard)
+
+        return result
+
+    async def _persist(
+        self,
+        query: str,
+        latitude: float,
+        longitude: float,
+        radius: int,
+        result: SearchResult,
+    ):
+        await self._safe_save_jobs_cache(
+            query,
+            latitude,
+            longitude,
+            radius,
+            result.jobs,
+            result.partial,
+            result.sources,
+        )
+        await self._safe_save_jobs_data(result.rows())
+
+    async def _search_providers(
+        self,
+        query: str,
+        longitude: float,
+        latitude: float,
+        radius: int,
+        insee: str,
+        on_result: Optional[Callable[[tuple], None]] = None,
+    ) -> SearchResult:
+        deduper = JobDeduper()
+        deduping = 0.0
+        sources = {}
+
+        with stage("search.providers"):
+            async for name, provider_jobs, status in self._iter_providers(
+                query, longitude, latitude, radius, insee
+            ):
+                # pages are deduplicated as they arrive, for on_result to
+                # only get jobs no other provider listed before
+                started = perf_counter()
+                new_jobs = deduper.add(provider_jobs)
+                deduping += perf_counter() - started
+                if status is not None:
+                    sources[name] = status
+                if on_result is not None and (new_jobs or status is not None):
+                    on_result((name, new_jobs, status))
+
+        started = perf_counter()
+        jobs = deduper.jobs()
+        record_stage("dedupe", deduping + perf_counter() - started)
+        return SearchResult(jobs=jobs, sources=sources)
+
+    async def _iter_providers(
+        self,
+        query: str,
+        longitude: float,
+        latitude: float,
+        radius: int,
+        insee: str,
+    ) -> AsyncIterator[Tuple[str, List[Job], Optional[SourceStatus]]]:
+        """
+        Yield each page of jobs as soon as a provider returns it, as
+        (name, jobs, None), then (name, [], status) once the provider is done.
+        Providers still running when the search budget runs out are cancelled
+        and reported as timed out, keeping the pages they already returned.
+        """
+        # WTTJ and APEC start right away, LBA as soon as its ROME codes resolve
+        searches = {
+            "wttj": lambda: self.wttj_service.iter_jobs(
+                query, latitude, longitude, radius
+            ),
+            "apec": lambda: self.apec_service.iter_jobs(query, insee),
+            "lba": lambda: self._iter_lba(query, longitude, latitude, radius, insee),
+        }
+
+        started = perf_counter()
+        queue = asyncio.Queue()
+        tasks = [
+            asyncio.create_task(self._run_provider(name, search, query, queue))
+            for name, search in searches.items()
         ]
+        counts = dict.fromkeys(searches, 0)
+        running = set(searches)
+        # stays None when the caller stops iterating early
+        reason = None
 
-        if romes:
-            searches.append(
-                self.lba_service.search_jobs(latitude, longitude, radius, insee, codes)
+        try:
+            while running:
+                remaining = self.search_budget - (perf_counter() - started)
+                if remaining <= 0:
+                    reason = BUDGET_SPENT
+                    break
+                try:
+                    name, jobs, status = await asyncio.wait_for(
+                        queue.get(), timeout=remaining
+                    )
+                except TimeoutError:
+                    reason = BUDGET_SPENT
+                    break
+                counts[name] += len(jobs)
+                if status is not None:
+                    running.discard(name)
+                yield name, jobs, status
+        finally:
+            for task in tasks:
+                task.cancel(reason)
+
+        elapsed_ms = (perf_counter() - started) * 1000
+        for name in running:
+            self.logger.warning(f"{name} exceeded the search budget, skipping it")
+            status = SourceStatus(
+                status="timeout", elapsed_ms=elapsed_ms, count=counts[name]
             )
+            yield name, [], status
+
+    async def _run_provider(
+        self,
+        name: str,
+        search: Callable[[], AsyncIterator[List[Job]]],
+        query: str,
+        queue: asyncio.Queue,
+    ):
+        started = perf_counter()
+        timeout = self.provider_timeouts.get(name)
+        breaker = self.breakers[name]
+        count = 0
+        pages = 0
 
-        results = await asyncio.gather(*searches, return_exceptions=True)
+        if not breaker.allow():
+            # the provider keeps failing, do not wait on it
+            status = SourceStatus(status="circuit_open", elapsed_ms=0)
+            record_stage("provider", 0, "circuit_open", provider=name)
+            queue.put_nowait((name, [], status))
+            return
 
-        for r in results:
-            if isinstance(r, Exception):
-                self.logger.error("Failed to get jobs from a provider", exc_info=r)
-            else:
-                for job in r:
-                    job.search_query = query
-                jobs.extend(r)
+        # tagged like the cache keys, so every spelling finds the same rows
+        search_query = normalize_text(query)
+        self.retry_budget.deposit()
+        try:
+            async with asyncio.timeout(timeout):
+                attempt = 0
+                while True:
+                    try:
+                        async for jobs in search():
+                            for job in jobs:
+                                job.search_query = search_query
+                            pages += 1
+                            if jobs:
+                                count += len(jobs)
+                                queue.put_nowait((name, jobs, None))
+                        break
+                    except Exception as e:
+                        # pages already streamed cannot be taken back
+                        if (
+                            pages
+                            or attempt >= self.max_retries
+                            or not is_retryable(e)
+                            or not self.retry_budget.withdraw()
+                        ):
+                            raise
+                        attempt += 1
+                        self.logger.warning(f"Retrying {name} after: {e}")
+                        await asyncio.sleep(backoff(attempt))
+        except asyncio.CancelledError as e:
+            elapsed = perf_counter() - started
+            breaker.record(False, elapsed)
+            # otherwise the search itself was cancelled
+            outcome = "timeout" if BUDGET_SPENT in e.args else "cancelled"
+            record_stage("provider", elapsed, outcome, provider=name)
+            PROVIDER_RESULTS.add(count, {"source": name})
+            raise
+        except TimeoutError:
+            self.logger.warning(f"{name} timed out after {timeout}s")
+            status = "timeout"
+        except Exception as e:
+            self.logger.error(f"Failed to get jobs from {name}: {e}", exc_info=True)
+            status = "error"
+        else:
+            # a provider that yields no page at all was not queried
+            status = "ok" if pages else "skipped"
+
+        elapsed = perf_counter() - started
+        if status == "skipped":
+            breaker.release()
+        else:
+            breaker.record(status == "ok", elapsed)
+        record_stage("provider", elapsed, status, provider=name)
+        PROVIDER_RESULTS.add(count, {"source": name})
 
-        background_tasks.add_task(
-            self._safe_save_jobs_cache, query, latitude, longitude, radius, jobs
+        status = SourceStatus(
+            status=status, elapsed_ms=round(elapsed * 1000, 1), count=count
         )
-        background_tasks.add_task(self._safe_save_jobs_data, jobs)
+        queue.put_nowait((name, [], status))
 
-        return jobs
+    async def _iter_lba(
+        self, query: str, longitude: float, latitude: float, radius: int, insee: str
+    ) -> AsyncIterator[List[Job]]:
+        # a failed lookup raises, so that LBA is reported as failed, not skipped
+        romes = await self.rome_service.fetch_rome(query)
+        if not romes:
+            # LBA can only be queried by ROME code
+            return
 
-    async def _safe_save_jobs_cache(self, query, latitude, longitude, radius, jobs):
+        # the LBA API has no pagination, everything comes in one response
+        codes = ",".join(rome.code for rome in romes)
+        yield await self.lba_service.fetch_jobs(
+            latitude, longitude, radius, insee, codes
+        )
+
+    async def _safe_save_jobs_cache(
+        self, query, latitude, longitude, radius, jobs, partial=False, sources=None
+    ):
         try:
-            await self.cache_service.save_jobs(query, latitude, longitude, radius, jobs)
+            with stage("background", task="cache_save"):
+                await self.cache_service.save_jobs(
+                    query,
+                    latitude,
+                    longitude,
+                    radius,
+                    jobs,
+                    partial=partial,
+                    sources=sources,
+                )
         except Exception as e:
             self.logger.error(f"Background task failed: {str(e)}", exc_info=True)
 
-    async def _safe_save_jobs_data(self, jobs):
+    async def _safe_save_jobs_data(self, rows: List[dict]):
         try:
-            self.data_service.save_jobs_data(jobs)
+            with stage("background", task="ingestion"):
+                if self.ingestion_queue is not None:
+                    self.ingestion_queue.put_rows(rows)
+                elif rows:
+                    table_rows = self.data_service.get_job_rows(rows)
+                    await asyncio.to_thread(self.data_service.save_rows, table_rows)
         except Exception as e:
             self.logger.error(f"Background task failed: {str(e)}", exc_info=True)
@@ -0,0 +1,51 @@
+import asyncio
+import math
+from typing import AsyncIterator, Awaitable, Callable, List, Tuple
+
+from models.job import Job
+
+# fetch_page(index) -> (jobs of that page, total number of results)
+PageFetcher = Callable[[int], Awaitable[Tuple[List[Job], int]]]
+
+
+async def iter_pages(
+    fetch_page: PageFetcher, page_size: int, max_results: int, concurrency: int
+) -> AsyncIterator[List[Job]]:
+    """
+    Yield up to `max_results` jobs, one page at a time.
+
+    The first page tells how many results there are. The pages still needed
+    are then fetched concurrently, at most `concurrency` at a time, and
+    yielded as they complete. Pages still running once `max_results` is
+    reached are cancelled.
+    """
+    jobs, total = await fetch_page(0)
+    jobs = jobs[:max_results]
+    yield jobs
+
+    count = len(jobs)
+    wanted = min(total, max_results)
+    if count >= wanted or len(jobs) < page_size:
+        return
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(index: int) -> Tuple[List[Job], int]:
+        async with semaphore:
+            return await fetch_page(index)
+
+    tasks = [
+        asyncio.create_task(bounded(index))
+        for index in range(1, math.ceil(wanted / page_size))
+    ]
+    try:
+        for next_page in asyncio.as_completed(tasks):
+            jobs, _ = await next_page
+            jobs = jobs[: max_results - count]
+            count += len(jobs)
+            yield jobs
+            if count >= max_results:
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
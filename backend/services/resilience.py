@@ -0,0 +1,165 @@
+import asyncio
+import random
+from collections import deque
+from time import monotonic
+from typing import Literal
+
+import httpx
+
+CircuitState = Literal["closed", "open", "half_open"]
+
+
+class CircuitBreaker:
+    """
+    Stops calling a provider that keeps failing or answering slowly.
+
+    The outcome of the last `window_size` calls is kept. Once at least
+    `min_calls` are known and the share of failures, or of calls slower than
+    `slow_call_seconds`, reaches its threshold, the circuit opens and calls
+    are refused for `open_seconds`. It is then half-open: one probe call goes
+    through, and closes the circuit on success or opens it again on failure.
+    """
+
+    def __init__(
+        self,
+        window_size: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 5.0,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30.0,
+    ):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.calls: deque = deque(maxlen=window_size)
+        self.state: CircuitState = "closed"
+        self.opened_at = 0.0
+        self.probing = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+
+        if self.state == "open":
+            if monotonic() - self.opened_at < self.open_seconds:
+                return False
+            self.state = "half_open"
+
+        # half-open: a single probe at a time
+        if self.probing:
+            return False
+        self.probing = True
+        return True
+
+    def record(self, success: bool, elapsed: float):
+        slow = elapsed >= self.slow_call_seconds
+
+        if self.state == "open":
+            # a call started before the circuit opened
+            return
+
+        if self.state == "half_open":
+            self.probing = False
+            if success and not slow:
+                self.state = "closed"
+                self.calls.clear()
+            else:
+                self._open()
+            return
+
+        self.calls.append((success, slow))
+        if len(self.calls) < self.min_calls:
+            return
+
+        failures = sum(1 for ok, _ in self.calls if not ok) / len(self.calls)
+        slow_calls = sum(1 for _, is_slow in self.calls if is_slow) / len(self.calls)
+        if failures >= self.failure_rate or slow_calls >= self.slow_call_rate:
+            self._open()
+
+    def release(self):
+        """
+        Give back an allowed call that did not reach the provider.
+        """
+        self.probing = False
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = monotonic()
+        self.calls.clear()
+
+    def snapshot(self) -> dict:
+        failures = sum(1 for ok, _ in self.calls if not ok)
+        return {"state": self.state, "calls": len(self.calls), "failures": failures}
+
+
+class RetryBudget:
+    """
+    Caps retries to a share of the calls made, so retries cannot multiply
+    the load on a provider that is already struggling.
+
+    Every call deposits `ratio` of a retry, a retry withdraws a whole one,
+    and `min_per_second` retries are always allowed.
+    """
+
+    def __init__(
+        self, ratio: float = 0.1, min_per_second: float = 1.0, max_balance: float = 10
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_balance = max_balance
+        self.balance = max_balance
+        self.updated_at = monotonic()
+
+    def deposit(self):
+        self._refill()
+        self.balance = min(self.max_balance, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self.balance < 1:
+            return False
+        self.balance -= 1
+        return True
+
+    def _refill(self):
+        now = monotonic()
+        elapsed, self.updated_at = now - self.updated_at, now
+        self.balance = min(
+            self.max_balance, self.balance + elapsed * self.min_per_second
+        )
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 1 / `rate` seconds apart, `rate` <= 0 disables it.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next_at = 0.0
+
+    async def acquire(self):
+        now = monotonic()
+        wait = self.next_at - now
+        # reserve the next slot before sleeping so concurrent callers queue up
+        self.next_at = max(now, self.next_at) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Network errors, rate limiting and server errors may succeed on retry.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+def backoff(attempt: int, base: float = 0.2, cap: float = 2.0) -> float:
+    # full jitter: spread retries of concurrent requests apart
+    return random.uniform(0, min(cap, base * 2**attempt))
@@ -1,58 +1,138 @@
+import hashlib
 import logging
-from time import time
-from typing import List
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 
 import httpx
+from google.cloud import firestore
 
 from models.rome_code import RomeCode
+from services.memory_cache import MemoryCache
+from services.oauth import OAuthToken
+from services.singleflight import SingleFlight
+from services.telemetry import stage
+from services.text import normalize_text
 
 
 class RomeService:
-    def __init__(self, client_id: str, client_secret: str):
+    """
+    Resolves job titles to ROME codes through the France Travail API.
+
+    The query -> codes mapping barely changes, so successful lookups are kept
+    in memory for `cache_ttl` seconds under a normalized key (case, accents,
+    whitespace) and, when `persist` is set, in Firestore so they survive
+    restarts and are shared between instances.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        client: httpx.AsyncClient,
+        cache_ttl: float = 604800,
+        cache_max_size: int = 1024,
+        persist: bool = False,
+    ):
         self.client_id = client_id
         self.client_secret = client_secret
+        self.client = client
         self.credential_url = "https://entreprise.francetravail.fr/connexion/oauth2/access_token?realm=/partenaire"
         self.url = "https://api.francetravail.io/partenaire/rome-metiers/v1/metiers/appellation/requete"
-        self.token = None
-        self.expiration_time = -1
+        self.token = OAuthToken(
+            client,
+            self.credential_url,
+            {
+                "grant_type": "client_credentials",
+                "client_id": client_id,
+                "client_secret": client_secret,
+                "scope": "api_rome-metiersv1 nomenclatureRome",
+            },
+        )
+        self.cache_ttl = cache_ttl
+        self.cache = MemoryCache(max_size=cache_max_size, ttl=cache_ttl)
+        self.inflight = SingleFlight()
+        self.db = firestore.AsyncClient() if persist else None
+        self.collection_name = "rome_searches"
         self.logger = logging.getLogger(__name__)
 
     async def search_rome(self, query: str) -> List[RomeCode]:
-        if time() >= self.expiration_time:
-            oauth_payload = {
-                "grant_type": "client_credentials",
-                "client_id": self.client_id,
-                "client_secret": self.client_secret,
-                "scope": "api_rome-metiersv1 nomenclatureRome",
-            }
+        try:
+            return await self.fetch_rome(query)
+        except Exception as e:
+            self.logger.error(f"ROME lookup error: {e}", exc_info=True)
+            return []
 
-            oauth_headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    async def fetch_rome(self, query: str) -> List[RomeCode]:
+        """
+        Same as search_rome, but lets OAuth and API errors propagate to the
+        caller. Errors are not cached, the next search tries again.
+        """
+        key = normalize_text(query)
 
-            try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        self.credential_url, data=oauth_payload, headers=oauth_headers
-                    )
-                response.raise_for_status()
-                data = response.json()
-            except Exception as e:
-                self.logger.error(f"OAuth ROME error: {e}", exc_info=True)
-                return []
+        codes = self.cache.get(key)
+        if codes is None:
+            codes = await self.inflight.do(key, lambda: self._lookup(key, query))
 
-            self.token = data["access_token"]
-            self.expiration_time = time() + data["expires_in"] - 60
+        return list(codes)
 
-        params = {"q": query}
-        headers = {"Authorization": f"Bearer {self.token}"}
+    async def _lookup(self, key: str, query: str) -> List[RomeCode]:
+        codes = await self._load_persisted(key)
+        if codes is not None:
+            self.cache.set(key, codes)
+            return codes
+
+        codes = await self._fetch_rome(query)
+        self.cache.set(key, codes)
+        await self._persist(key, codes)
+        return codes
+
+    def _document(self, key: str):
+        # normalized queries may contain "/" which Firestore ids cannot
+        doc_id = hashlib.md5(key.encode("utf-8")).hexdigest()
+        return self.db.collection(self.collection_name).document(doc_id)
+
+    async def _load_persisted(self, key: str) -> Optional[List[RomeCode]]:
+        if self.db is None:
+            return None
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.url, params=params, headers=headers)
-            response.raise_for_status()
-            data = response.json()
+            doc_ref = self._document(key)
+            doc_snapshot = await doc_ref.get()
         except Exception as e:
-            self.logger.error(f"API ROME error: {e}", exc_info=True)
-            return []
+            self.logger.error(f"ROME cache read error: {e}", exc_info=True)
+            return None
+
+        if not doc_snapshot.exists:
+            return None
+        data = doc_snapshot.to_dict()
+        if data["expire_at"] <= datetime.now(timezone.utc):
+            return None
+        return [RomeCode.model_validate(code) for code in data.get("codes", [])]
+
+    async def _persist(self, key: str, codes: List[RomeCode]):
+        if self.db is None:
+            return
+
+        expire_at = datetime.now(timezone.utc) + timedelta(seconds=self.cache_ttl)
+        document_content = {
+            "expire_at": expire_at,
+            "codes": [code.model_dump() for code in codes],
+        }
+        try:
+            await self._document(key).set(document_content)
+        except Exception as e:
+            self.logger.error(f"ROME cache write error: {e}", exc_info=True)
+
+    async def _fetch_rome(self, query: str) -> List[RomeCode]:
+        token = await self.token.get()
+
+        params = {"q": query}
+        headers = {"Authorization": f"Bearer {token}"}
+
+        with stage("provider.request", provider="rome"):
+            response = await self.client.get(self.url, params=params, headers=headers)
+            response.raise_for_status()
+        data = response.json()
 
         if data["totalResultats"] == 0:
             return []
@@ -0,0 +1,40 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls: callers using the same key while a call is
+    in flight wait for that call instead of starting their own.
+    """
+
+    def __init__(self):
+        self.calls: Dict[str, asyncio.Task] = {}
+
+    def is_running(self, key: str) -> bool:
+        return key in self.calls
+
+    def start(
+        self, key: str, fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[asyncio.Task, bool]:
+        """
+        Return the call in flight for `key`, starting it with `fn` if there is
+        none, and whether this caller started it.
+        """
+        task = self.calls.get(key)
+        if task is not None:
+            return task, False
+
+        task = asyncio.create_task(fn())
+        self.calls[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+        return task, True
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task, _ = self.start(key, fn)
+        # shield so a disconnecting caller does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
@@ -0,0 +1,177 @@
+import asyncio
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Iterator, List, Optional, Tuple
+
+from opentelemetry import trace
+from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.exporter.prometheus import PrometheusMetricReader
+from opentelemetry.metrics import Meter
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from opentelemetry.sdk.metrics.view import ExplicitBucketHistogramAggregation, View
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+
+# The SDK providers are owned here rather than installed as the OpenTelemetry
+# globals, which can only be set once per process: setup_telemetry may run
+# again after shutdown_telemetry, e.g. for each lifespan of the app. Until
+# setup, and for spans when no OTLP endpoint is configured, every call is a
+# no-op.
+tracer: trace.Tracer = trace.NoOpTracer()
+
+_instruments: List["_Instrument"] = []
+_providers: List = []
+
+
+class _Instrument:
+    """
+    A counter or histogram of the meter provider setup_telemetry installed,
+    created again whenever it installs a new one.
+    """
+
+    def __init__(self, kind: str, name: str, **options):
+        self.kind = kind
+        self.name = name
+        self.options = options
+        self.instrument = None
+        _instruments.append(self)
+
+    def bind(self, meter: Optional[Meter]):
+        if meter is None:
+            self.instrument = None
+        else:
+            create = getattr(meter, f"create_{self.kind}")
+            self.instrument = create(self.name, **self.options)
+
+    def add(self, amount: float, attributes: Optional[dict] = None):
+        if self.instrument is not None:
+            self.instrument.add(amount, attributes)
+
+    def record(self, amount: float, attributes: Optional[dict] = None):
+        if self.instrument is not None:
+            self.instrument.record(amount, attributes)
+
+
+STAGE_DURATION = _Instrument(
+    "histogram",
+    "jobnexus.stage.duration",
+    unit="ms",
+    description="Time spent in each stage of a search, a request or a task",
+)
+PROVIDER_RESULTS = _Instrument(
+    "counter",
+    "jobnexus.provider.results",
+    unit="{job}",
+    description="Jobs returned per source, before deduplication",
+)
+CACHE_LOOKUPS = _Instrument(
+    "counter",
+    "jobnexus.cache.lookups",
+    unit="{lookup}",
+    description="Search cache lookups per tier and result",
+)
+
+# from a memory hit to a provider hitting its timeout
+STAGE_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def setup_telemetry(otlp_endpoint: str = "", trace_sample_ratio: float = 0.1):
+    """
+    Install the OpenTelemetry SDK: metrics are served on /metrics, and with
+    `otlp_endpoint` also pushed over OTLP/HTTP along with the sampled spans.
+    Has no effect while the SDK is installed.
+    """
+    global tracer
+    if _providers:
+        return
+
+    resource = Resource.create({"service.name": "jobnexus"})
+    readers = [PrometheusMetricReader()]
+    if otlp_endpoint:
+        endpoint = otlp_endpoint.rstrip("/")
+        readers.append(
+            PeriodicExportingMetricReader(
+                OTLPMetricExporter(endpoint=f"{endpoint}/v1/metrics")
+            )
+        )
+        tracer_provider = TracerProvider(
+            resource=resource,
+            sampler=ParentBased(TraceIdRatioBased(trace_sample_ratio)),
+        )
+        tracer_provider.add_span_processor(
+            BatchSpanProcessor(OTLPSpanExporter(endpoint=f"{endpoint}/v1/traces"))
+        )
+        tracer = tracer_provider.get_tracer("jobnexus")
+        _providers.append(tracer_provider)
+
+    meter_provider = MeterProvider(
+        resource=resource,
+        metric_readers=readers,
+        views=[
+            View(
+                instrument_name="jobnexus.stage.duration",
+                aggregation=ExplicitBucketHistogramAggregation(STAGE_BUCKETS_MS),
+            )
+        ],
+    )
+    meter = meter_provider.get_meter("jobnexus")
+    for instrument in _instruments:
+        instrument.bind(meter)
+    _providers.append(meter_provider)
+
+
+def shutdown_telemetry():
+    """
+    Export what is still pending before the instance goes away, then
+    uninstall the SDK so that setup_telemetry can install it again.
+    """
+    global tracer
+    for instrument in _instruments:
+        instrument.bind(None)
+    tracer = trace.NoOpTracer()
+    for provider in _providers:
+        provider.shutdown()
+    _providers.clear()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def record_stage(stage: str, elapsed: float, outcome: str = "ok", **attributes):
+    """
+    Record `elapsed` seconds for a stage timed by the caller. Attributes
+    become metric labels: keep them to a handful of values, never a query.
+    """
+    STAGE_DURATION.record(
+        elapsed * 1000, {"stage": stage, "outcome": outcome, **attributes}
+    )
+
+
+@contextmanager
+def stage(name: str, **attributes) -> Iterator[trace.Span]:
+    """
+    Time the block in a span and in the stage histogram, with outcome "ok",
+    "error" when it raises or "cancelled".
+
+    Not for use across the yields of an async generator: the span would stay
+    current for whatever the consumer runs in between.
+    """
+    started = perf_counter()
+    outcome = "ok"
+    try:
+        with tracer.start_as_current_span(name, attributes=attributes) as span:
+            yield span
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        record_stage(name, perf_counter() - started, outcome, **attributes)
@@ -0,0 +1,27 @@
+import re
+import unicodedata
+
+WHITESPACE = re.compile(r"\s+")
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase, strip accents and collapse whitespace, e.g. " Ingénieur  Cloud"
+    becomes "ingenieur cloud".
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return WHITESPACE.sub(" ", stripped).strip().lower()
+
+
+def city_key(city: str) -> str:
+    """
+    Normalized city name without district or department numbers: "Paris 15e",
+    "Paris (75)" and "75 - Paris" all become "paris".
+    """
+    return " ".join(
+        t
+        for t in TOKEN.findall(normalize_text(city or ""))
+        if t != "arrondissement" and not any(c.isdigit() for c in t)
+    )
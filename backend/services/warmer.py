@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from typing import Dict, List, Sequence
+
+from models.warmup import WarmTarget
+from services.orchestrator import OrchestratorService
+from services.resilience import RateLimiter
+
+
+class CacheWarmer:
+    """
+    Refreshes a fixed list of searches before their cache entries go stale,
+    so the first user after a refresh is due does not wait on the providers.
+    Refreshed jobs reach BigQuery through the orchestrator in the same pass.
+
+    At most `concurrency` searches run at once, and every search calls each
+    provider, so searches are started no faster than the slowest of the
+    `provider_rates` (calls per second) allows.
+    """
+
+    def __init__(
+        self,
+        orchestrator: OrchestratorService,
+        targets: Sequence[WarmTarget],
+        ahead: float = 25200,
+        concurrency: int = 2,
+        provider_rates: Dict[str, float] | None = None,
+    ):
+        self.orchestrator = orchestrator
+        self.targets = list(targets)
+        self.ahead = ahead
+        self.concurrency = concurrency
+        self.limiters = [RateLimiter(rate) for rate in (provider_rates or {}).values()]
+        self.logger = logging.getLogger(__name__)
+
+    async def run(self) -> List[dict]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def warm(target: WarmTarget) -> dict:
+            async with semaphore:
+                for limiter in self.limiters:
+                    await limiter.acquire()
+                return await self._warm(target)
+
+        return await asyncio.gather(*(warm(target) for target in self.targets))
+
+    async def _warm(self, target: WarmTarget) -> dict:
+        summary = target.model_dump()
+        try:
+            result = await self.orchestrator.warm_cache(
+                target.query,
+                target.longitude,
+                target.latitude,
+                target.radius,
+                target.insee,
+                self.ahead,
+            )
+        except Exception as e:
+            self.logger.error(f"Warming {target.query} failed: {e}", exc_info=True)
+            return {**summary, "status": "error"}
+
+        if result is None:
+            return {**summary, "status": "fresh"}
+        return {
+            **summary,
+            "status": "partial" if result.partial else "refreshed",
+            "count": len(result.jobs),
+        }
@@ -1,22 +1,79 @@
 import logging
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
 import httpx
 
-from models.job import Job
+from models.job import Job, validate_jobs
+from services.geo import parse_coordinates
+from services.pagination import iter_pages
+from services.telemetry import stage
+
+# largest page Algolia is asked for
+PAGE_SIZE = 50
 
 
 class WelcomeService:
-    def __init__(self, wttj_app_id: str, wttj_api_key: str):
+    def __init__(
+        self,
+        wttj_app_id: str,
+        wttj_api_key: str,
+        client: httpx.AsyncClient,
+        max_results: int = 150,
+        page_concurrency: int = 3,
+    ):
         self.app_id = wttj_app_id
         self.api_key = wttj_api_key
+        self.client = client
         self.index = "wttj_jobs_production_fr"
+        self.max_results = max_results
+        self.page_concurrency = page_concurrency
         self.logger = logging.getLogger(__name__)
 
     async def search_jobs(
         self, query: str, latitude: float, longitude: float, radius: int
     ) -> List[Job]:
+        try:
+            return await self.fetch_jobs(query, latitude, longitude, radius)
+        except Exception as e:
+            self.logger.error(f"WTTJ error: {e}", exc_info=True)
+            return []
+
+    async def fetch_jobs(
+        self, query: str, latitude: float, longitude: float, radius: int
+    ) -> List[Job]:
+        """
+        Same as search_jobs, but lets provider errors propagate to the caller.
+        """
+        jobs = []
+        async for page in self.iter_jobs(query, latitude, longitude, radius):
+            jobs.extend(page)
+        return jobs
 
+    def iter_jobs(
+        self, query: str, latitude: float, longitude: float, radius: int
+    ) -> AsyncIterator[List[Job]]:
+        """
+        Yield up to `max_results` jobs page by page, as the pages arrive.
+        """
+        page_size = min(PAGE_SIZE, self.max_results)
+        return iter_pages(
+            lambda page: self._fetch_page(
+                query, latitude, longitude, radius, page, page_size
+            ),
+            page_size,
+            self.max_results,
+            self.page_concurrency,
+        )
+
+    async def _fetch_page(
+        self,
+        query: str,
+        latitude: float,
+        longitude: float,
+        radius: int,
+        page: int,
+        page_size: int,
+    ) -> Tuple[List[Job], int]:
         url = f"https://{self.app_id}-dsn.algolia.net/1/indexes/{self.index}/query"
 
         headers = {
@@ -31,32 +88,29 @@ class WelcomeService:
         payload = {
             "query": query,
             "filters": "contract_type:apprenticeship",
-            "hitsPerPage": 50,
+            "hitsPerPage": page_size,
+            "page": page,
             "attributesToRetrieve": [
                 "name",
                 "organization",
                 "offices",
                 "contract_type",
                 "slug",
+                "_geoloc",
             ],
             "aroundLatLng": f"{latitude},{longitude}",
             "aroundRadius": radius * 1000,
         }
 
-        try:
-            async with httpx.AsyncClient() as client:
-                result = await client.post(url, json=payload, headers=headers)
-
+        with stage("provider.request", provider="wttj"):
+            result = await self.client.post(url, json=payload, headers=headers)
             result.raise_for_status()
 
-            hits = result.json()["hits"]
-            results = [self._parse_algolia_hit(hit) for hit in hits]
-            return results
-        except Exception as e:
-            self.logger.error(f"WTTJ error: {e}", exc_info=True)
-            return []
+        data = result.json()
+        results = validate_jobs([self._parse_algolia_hit(hit) for hit in data["hits"]])
+        return results, data.get("nbHits", len(results))
 
-    def _parse_algolia_hit(self, hit: Dict[str, Any]) -> Job:
+    def _parse_algolia_hit(self, hit: Dict[str, Any]) -> dict:
         offre_slug = hit.get("slug")
         organization = hit.get("organization", {})
         organization_slug = organization.get("slug")
@@ -71,11 +125,18 @@ class WelcomeService:
             elif isinstance(raw_city, str):
                 city = raw_city
 
-        return Job(
-            title=hit.get("name"),
-            company=organization.get("name"),
-            city=city,
-            url=f"https://www.welcometothejungle.com/fr/companies/{organization_slug}/jobs/{offre_slug}",
-            target_diploma_level="Inconnu",
-            source="WTTJ",
-        )
+        geoloc = hit.get("_geoloc") or {}
+        if isinstance(geoloc, list):
+            geoloc = geoloc[0] if geoloc else {}
+        latitude, longitude = parse_coordinates(geoloc.get("lat"), geoloc.get("lng"))
+
+        return {
+            "title": hit.get("name"),
+            "company": organization.get("name"),
+            "city": city,
+            "url": f"https://www.welcometothejungle.com/fr/companies/{organization_slug}/jobs/{offre_slug}",
+            "target_diploma_level": "Inconnu",
+            "source": "WTTJ",
+            "latitude": latitude,
+            "longitude": longitude,
+        }
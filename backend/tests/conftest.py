@@ -7,12 +7,21 @@ from services.orchestrator import OrchestratorService
 
 @pytest.fixture
 def mock_dependencies():
+    cache_service = AsyncMock()
+    cache_service._generate_cache_key = MagicMock(
+        side_effect=lambda *args: "_".join(str(arg) for arg in args)
+    )
+    # paginated providers are consumed as async iterators of pages
+    wttj_service = AsyncMock()
+    wttj_service.iter_jobs = MagicMock()
+    apec_service = AsyncMock()
+    apec_service.iter_jobs = MagicMock()
     return {
         "lba_service": AsyncMock(),
         "rome_service": AsyncMock(),
-        "wttj_service": AsyncMock(),
-        "cache_service": AsyncMock(),
-        "apec_service": AsyncMock(),
+        "wttj_service": wttj_service,
+        "cache_service": cache_service,
+        "apec_service": apec_service,
         "data_service": MagicMock(),
     }
 
@@ -0,0 +1,53 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services.apec import ApecService
+
+
+def apec_transport(calls, refuse_first_search=False):
+    def handler(request):
+        calls.append(request.method)
+        if request.method == "GET":
+            return httpx.Response(200, headers={"Set-Cookie": "session=1"})
+        if refuse_first_search and calls.count("POST") == 1:
+            return httpx.Response(403)
+        return httpx.Response(200, json={"resultats": [], "totalCount": 0})
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_session_is_shared_by_concurrent_searches():
+    calls = []
+    client = httpx.AsyncClient(transport=apec_transport(calls))
+    service = ApecService(client)
+
+    await asyncio.gather(*(service.fetch_jobs("DevOps", "75056") for _ in range(5)))
+    await service.fetch_jobs("SRE", "75056")
+
+    assert calls.count("GET") == 1
+    assert calls.count("POST") == 6
+
+
+@pytest.mark.asyncio
+async def test_refused_search_refreshes_the_session_once():
+    calls = []
+    client = httpx.AsyncClient(transport=apec_transport(calls, True))
+    service = ApecService(client)
+
+    assert await service.fetch_jobs("DevOps", "75056") == []
+
+    assert calls == ["GET", "POST", "GET", "POST"]
+
+
+@pytest.mark.asyncio
+async def test_accented_query_is_searched():
+    calls = []
+    client = httpx.AsyncClient(transport=apec_transport(calls))
+    service = ApecService(client)
+
+    assert await service.fetch_jobs("Développeur", "75056") == []
+
+    assert calls == ["GET", "POST"]
@@ -0,0 +1,176 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from models.job import Job
+from models.search import SourceStatus
+from services.cache import CacheEntry, CacheService
+
+
+@pytest.fixture
+def cache_service():
+    with patch("services.cache.firestore.AsyncClient"):
+        service = CacheService(l1_max_size=2, l1_ttl=300)
+    return service
+
+
+def mock_document(service, expire_at, jobs):
+    snapshot = MagicMock()
+    snapshot.exists = True
+    snapshot.to_dict.return_value = {"expire_at": expire_at, "jobs": jobs}
+    doc_ref = service.db.collection.return_value.document.return_value
+    doc_ref.get = AsyncMock(return_value=snapshot)
+    return doc_ref
+
+
+def make_job(title):
+    return Job(
+        title=title,
+        company="Corp",
+        city="Paris",
+        url=f"http://{title}",
+        target_diploma_level="Master",
+        source="WTTJ",
+    )
+
+
+@pytest.mark.asyncio
+async def test_l1_hit_skips_firestore(cache_service):
+    expire_at = datetime.now(timezone.utc) + timedelta(days=1)
+    doc_ref = mock_document(cache_service, expire_at, [make_job("Dev").model_dump()])
+
+    first = await cache_service.get_jobs("Dev", 48.85, 2.35, 10)
+    second = await cache_service.get_jobs("Dev", 48.85, 2.35, 10)
+
+    assert [job.title for job in first] == ["Dev"]
+    assert [job.title for job in second] == ["Dev"]
+    # the second lookup is served from memory
+    assert doc_ref.get.await_count == 1
+    stats = cache_service.get_stats()
+    assert stats["l1"]["hits"] == 1
+    assert stats["l2"]["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_l1_respects_firestore_expiry(cache_service):
+    # the document expires before the L1 TTL would
+    expire_at = datetime.now(timezone.utc) + timedelta(seconds=5)
+    mock_document(cache_service, expire_at, [make_job("Dev").model_dump()])
+
+    await cache_service.get_jobs("Dev", 48.85, 2.35, 10)
+
+    key = cache_service._generate_cache_key("Dev", 48.85, 2.35, 10)
+    deadline, _ = cache_service.l1.entries[key]
+    assert deadline == pytest.approx(expire_at.timestamp())
+
+
+@pytest.mark.asyncio
+async def test_expired_document_is_a_miss(cache_service):
+    expire_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    mock_document(cache_service, expire_at, [make_job("Dev").model_dump()])
+
+    assert await cache_service.get_jobs("Dev", 48.85, 2.35, 10) is None
+    assert cache_service.get_stats()["l2"]["misses"] == 1
+    assert not cache_service.l1.entries
+
+
+def test_l1_evicts_least_recently_used(cache_service):
+    cache_service.l1.set("a", 1)
+    cache_service.l1.set("b", 2)
+    cache_service.l1.get("a")
+    cache_service.l1.set("c", 3)
+
+    assert list(cache_service.l1.entries) == ["a", "c"]
+    assert cache_service.l1.stats()["evictions"] == 1
+
+
+def test_nearby_searches_share_a_key(cache_service):
+    key = cache_service._generate_cache_key("Ingénieur Cloud", 48.8566, 2.3522, 30)
+
+    # a few hundred meters away, different case and accents
+    assert key == cache_service._generate_cache_key(
+        "ingenieur  cloud", 48.8570, 2.3540, 30
+    )
+    assert key != cache_service._generate_cache_key("ingenieur cloud", 45.76, 4.83, 30)
+    assert key != cache_service._generate_cache_key(
+        "ingenieur cloud", 48.8566, 2.3522, 10
+    )
+
+
+@pytest.mark.asyncio
+async def test_miss_is_served_from_a_wider_search(cache_service):
+    cache_service.fallback_radii = [100]
+    near = make_job("Near").model_copy(update={"latitude": 48.86, "longitude": 2.35})
+    far = make_job("Far").model_copy(
+        update={"city": "Lyon", "latitude": 45.76, "longitude": 4.83}
+    )
+    # APEC offers only come with a city
+    unplaced = make_job("Apec").model_copy(update={"city": "Paris - 75"})
+    elsewhere = make_job("Apec Lyon").model_copy(update={"city": "Lyon"})
+    cached = [near, far, unplaced, elsewhere]
+    expire_at = datetime.now(timezone.utc) + timedelta(days=1)
+    wide_key = cache_service._generate_cache_key("Dev", 48.85, 2.35, 100)
+    cache_service.l1.set(wide_key, CacheEntry(cached, expire_at, expire_at))
+    doc_ref = mock_document(cache_service, expire_at, [])
+    # only the wide search is cached
+    doc_ref.get.return_value.exists = False
+
+    jobs = await cache_service.get_jobs("Dev", 48.85, 2.35, 30)
+
+    assert [job.title for job in jobs] == ["Near", "Apec"]
+
+
+@pytest.mark.asyncio
+async def test_saved_documents_are_read_back(cache_service):
+    doc_ref = cache_service.db.collection.return_value.document.return_value
+    doc_ref.set = AsyncMock()
+    await cache_service.save_jobs("Dev", 48.85, 2.35, 10, [make_job("Dev")])
+    document = doc_ref.set.await_args.args[0]
+    assert "jobs" not in document
+
+    cache_service.l1.clear()
+    expire_at = datetime.now(timezone.utc) + timedelta(days=1)
+    mock_document(cache_service, expire_at, [])
+    doc_ref.get.return_value.to_dict.return_value = document
+
+    jobs = await cache_service.get_jobs("Dev", 48.85, 2.35, 10)
+
+    assert jobs == [make_job("Dev")]
+
+
+@pytest.mark.asyncio
+async def test_plain_job_list_is_only_written_on_request(cache_service):
+    doc_ref = cache_service.db.collection.return_value.document.return_value
+    doc_ref.set = AsyncMock()
+    cache_service.write_legacy_jobs = True
+
+    await cache_service.save_jobs("Dev", 48.85, 2.35, 10, [make_job("Dev")])
+
+    document = doc_ref.set.await_args.args[0]
+    # readable by revisions from before the blob
+    assert document["jobs"] == [make_job("Dev").model_dump()]
+    assert "jobs_blob" in document
+
+
+@pytest.mark.asyncio
+async def test_partial_searches_are_read_back_with_their_statuses(cache_service):
+    doc_ref = cache_service.db.collection.return_value.document.return_value
+    doc_ref.set = AsyncMock()
+    sources = {
+        "wttj": SourceStatus(status="ok", elapsed_ms=120, count=1),
+        "apec": SourceStatus(status="timeout", elapsed_ms=8000),
+    }
+    await cache_service.save_jobs(
+        "Dev", 48.85, 2.35, 10, [make_job("Dev")], partial=True, sources=sources
+    )
+    document = doc_ref.set.await_args.args[0]
+
+    cache_service.l1.clear()
+    mock_document(cache_service, document["expire_at"], [])
+    doc_ref.get.return_value.to_dict.return_value = document
+
+    entry = await cache_service.get_entry("Dev", 48.85, 2.35, 10)
+
+    assert entry.partial
+    assert entry.sources == sources
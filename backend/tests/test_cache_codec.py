@@ -0,0 +1,36 @@
+import json
+
+from models.job import Job
+from services.cache_codec import decode_jobs, encode_jobs
+
+
+def make_jobs(count):
+    return [
+        Job(
+            search_query="DevOps",
+            title=f"Ingénieur DevOps {i}",
+            company=f"Company {i % 7}",
+            city="Paris" if i % 2 else None,
+            url=f"https://www.apec.fr/candidat/recherche-emploi.html/emploi/detail-offre/{i}",
+            target_diploma_level="Inconnu",
+            source="APEC",
+            sources=["APEC", "WTTJ"] if i % 3 else [],
+            latitude=48.85 if i % 2 else None,
+            longitude=2.35 if i % 2 else None,
+        )
+        for i in range(count)
+    ]
+
+
+def test_round_trip():
+    jobs = make_jobs(20)
+
+    assert decode_jobs(encode_jobs(jobs)) == jobs
+    assert decode_jobs(encode_jobs([])) == []
+
+
+def test_blob_is_smaller_than_plain_documents():
+    jobs = make_jobs(200)
+    plain = json.dumps([job.model_dump() for job in jobs]).encode("utf-8")
+
+    assert len(encode_jobs(jobs)) * 10 < len(plain)
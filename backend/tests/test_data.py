@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import pyarrow
+import pytest
+
+from models.job import Job, dump_jobs
+from services.data import DataService
+from services.responses import dumps
+
+
+@pytest.fixture
+def data_service(monkeypatch):
+    monkeypatch.setenv("BIGQUERY_TABLE_ID", "project.dataset.jobs")
+    with (
+        patch("services.data.bigquery.Client"),
+        patch("services.data.bigquery_storage.BigQueryReadClient"),
+    ):
+        service = DataService()
+    return service
+
+
+def make_page(hashes):
+    scraped_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return pyarrow.table(
+        {
+            "title": [f"Job {h}" for h in hashes],
+            "scraped_at": [scraped_at] * len(hashes),
+            "job_hash": hashes,
+        }
+    )
+
+
+def test_page_token_round_trip():
+    scraped_at = datetime(2026, 1, 1, 12, 30, tzinfo=timezone.utc)
+    token = DataService.encode_page_token(scraped_at, "abc")
+
+    assert DataService.decode_page_token(token) == (scraped_at, "abc")
+    with pytest.raises(ValueError):
+        DataService.decode_page_token("not a token")
+
+
+def test_full_page_returns_cursor_of_last_row(data_service):
+    data_service._query_opportunities = MagicMock(
+        side_effect=[make_page(["b", "a"]), make_page(["0"])]
+    )
+
+    rows, token = data_service.get_opportunities("DevOps", limit=2)
+    assert [row["job_hash"] for row in rows] == ["b", "a"]
+    assert DataService.decode_page_token(token)[1] == "a"
+
+    rows, token = data_service.get_opportunities("DevOps", limit=2, page_token=token)
+    assert [row["job_hash"] for row in rows] == ["0"]
+    assert token is None
+    cursor = data_service._query_opportunities.call_args.args[3]
+    assert cursor[1] == "a"
+
+
+def test_arrow_results_become_rows_and_columns(data_service):
+    rows_iterator = data_service.client.query.return_value.result.return_value
+    rows_iterator.to_arrow.return_value = make_page(["b", "a"])
+
+    rows, _ = data_service.get_opportunities("DevOps", limit=10)
+    columns, _ = data_service.get_opportunities_columns("DevOps", limit=10)
+
+    # downloaded through the Storage Read API
+    kwargs = rows_iterator.to_arrow.call_args.kwargs
+    assert kwargs["bqstorage_client"] is data_service.read_client
+    scraped_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert rows == [
+        {"title": "Job b", "scraped_at": scraped_at, "job_hash": "b"},
+        {"title": "Job a", "scraped_at": scraped_at, "job_hash": "a"},
+    ]
+    assert columns == {
+        "title": ["Job b", "Job a"],
+        "scraped_at": [scraped_at, scraped_at],
+        "job_hash": ["b", "a"],
+    }
+    # sent as ISO 8601 with the UTC offset
+    assert dumps(rows[0]) == (
+        b'{"title":"Job b","scraped_at":"2026-01-01T00:00:00+00:00","job_hash":"b"}'
+    )
+    assert b'"scraped_at":["2026-01-01T00:00:00+00:00",' in dumps(columns)
+
+
+def test_recent_pages_are_served_from_memory(data_service):
+    data_service._query_opportunities = MagicMock(return_value=make_page(["a"]))
+
+    data_service.get_opportunities("DevOps", limit=10)
+    columns, _ = data_service.get_opportunities_columns("DevOps", limit=10)
+
+    assert columns["job_hash"] == ["a"]
+    data_service._query_opportunities.assert_called_once()
+
+
+def test_opportunities_are_filtered_on_the_normalized_query(data_service):
+    data_service._query_opportunities = MagicMock(return_value=make_page(["a"]))
+
+    data_service.get_opportunities(" Ingénieur  Cloud", limit=10)
+    data_service.get_opportunities("ingenieur cloud", limit=10)
+
+    # both spellings share one query and one cached page
+    data_service._query_opportunities.assert_called_once()
+    assert data_service._query_opportunities.call_args.args[0] == "ingenieur cloud"
+
+
+def test_stats_are_aggregated_once_per_category(data_service):
+    row = {
+        "total": 3,
+        "sources": 2,
+        "top_recruiter": "Acme",
+        "top_city": "Paris",
+        "daily": [{"day": datetime(2026, 1, 1).date(), "count": 3}],
+    }
+    data_service.client.query.return_value.result.return_value = [row]
+
+    stats = data_service.get_opportunity_stats("DevOps")
+    data_service.get_opportunity_stats("DevOps")
+
+    assert stats["daily"] == [{"day": "2026-01-01", "count": 3}]
+    assert stats["top_recruiter"] == "Acme"
+    data_service.client.query.assert_called_once()
+
+
+def test_merge_only_matches_recent_partitions(data_service):
+    data_service.save_rows([{"job_hash": "a"}])
+
+    query = data_service.client.query.call_args.args[0]
+    assert "ON T.job_hash = S.job_hash" in query
+    assert "AND T.scraped_at >= TIMESTAMP_SUB" in query
+
+
+def test_job_rows_match_job_dicts(data_service):
+    job = Job(
+        title="Dev",
+        company="Corp",
+        url="https://example.com/jobs/1?utm_source=x",
+        target_diploma_level="Master",
+        source="WTTJ",
+    )
+    dumped = dump_jobs([job])
+
+    row = data_service.get_job_rows(dumped)[0]
+
+    assert row["job_hash"] == data_service.get_job_dict(job)["job_hash"]
+    assert row["job_hash"] == data_service.generate_job_hash(job)
+    assert "job_hash" not in dumped[0]
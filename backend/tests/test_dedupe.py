@@ -0,0 +1,60 @@
+from models.job import Job
+from services.dedupe import dedupe_jobs
+
+
+def make_job(title, company="Acme", city="Paris", source="WTTJ", **fields):
+    return Job(
+        title=title,
+        company=company,
+        city=city,
+        url=f"https://example.com/{source}/{title}",
+        target_diploma_level=fields.pop("target_diploma_level", ""),
+        source=source,
+        **fields,
+    )
+
+
+def test_same_offer_from_several_providers_is_merged():
+    jobs = [
+        make_job("Ingénieur DevOps (H/F)", city="Paris 15e", source="WTTJ"),
+        make_job(
+            "Alternance - Ingénieur DevOps",
+            company="ACME SAS",
+            source="APEC",
+            target_diploma_level="Bac+5",
+        ),
+        make_job("Développeur Python", source="LBA"),
+    ]
+
+    deduped = dedupe_jobs(jobs)
+
+    assert [job.title for job in deduped] == [
+        "Alternance - Ingénieur DevOps",
+        "Développeur Python",
+    ]
+    assert deduped[0].sources == ["WTTJ", "APEC"]
+    assert deduped[1].sources == ["LBA"]
+
+
+def test_confidential_companies_are_not_merged():
+    jobs = [
+        make_job("Ingénieur Cloud", company="Entreprise confidentielle"),
+        make_job("Ingénieur Cloud", company="Confidentiel", source="APEC"),
+    ]
+
+    assert len(dedupe_jobs(jobs)) == 2
+
+
+def test_only_offers_from_different_sources_or_urls_are_merged():
+    first = make_job("Développeur Python")
+    # another offer from the same provider, same title and company
+    second = first.model_copy(update={"url": "https://example.com/2"})
+
+    assert len(dedupe_jobs([first, second])) == 2
+    assert len(dedupe_jobs([first, first.model_copy()])) == 1
+
+
+def test_titles_without_meaningful_words_are_not_merged():
+    jobs = [make_job("Alternance (H/F)"), make_job("Alternant", source="APEC")]
+
+    assert len(dedupe_jobs(jobs)) == 2
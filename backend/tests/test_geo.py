@@ -0,0 +1,16 @@
+from services.geo import distance_km, geohash, precision_for_radius
+
+
+def test_geohash_matches_reference():
+    # reference value from the geohash specification
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+
+def test_wider_searches_use_larger_cells():
+    assert precision_for_radius(10) == 6
+    assert precision_for_radius(30) == 5
+    assert precision_for_radius(200) == 4
+
+
+def test_distance_between_paris_and_lyon():
+    assert 390 < distance_km(48.8566, 2.3522, 45.764, 4.8357) < 395
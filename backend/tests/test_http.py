@@ -0,0 +1,49 @@
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from services.http import PROVIDER_POOLS, HttpClientPool
+
+
+@pytest.fixture
+def hosts():
+    return []
+
+
+@pytest.fixture
+def pool(hosts):
+    def handler(request):
+        hosts.append(request.url.host)
+        return httpx.Response(200)
+
+    return HttpClientPool(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_each_provider_reuses_its_own_client(pool, hosts):
+    clients = {provider: pool.get_client(provider) for provider in PROVIDER_POOLS}
+
+    assert len({id(client) for client in clients.values()}) == len(PROVIDER_POOLS)
+    for _ in range(2):
+        response = await pool.get_client("wttj").get("https://wttj.test/")
+        assert response.status_code == 200
+        assert pool.get_client("wttj") is clients["wttj"]
+    assert hosts == ["wttj.test", "wttj.test"]
+
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_aclose_closes_every_client_even_if_one_fails(pool):
+    clients = list(pool.clients.values())
+    failing = pool.get_client("apec")
+    failing.aclose = AsyncMock(side_effect=RuntimeError("boom"))
+
+    await pool.aclose()
+
+    assert pool.clients == {}
+    failing.aclose.assert_awaited_once()
+    assert all(client.is_closed for client in clients if client is not failing)
+    with pytest.raises(KeyError):
+        pool.get_client("wttj")
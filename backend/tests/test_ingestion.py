@@ -0,0 +1,162 @@
+import asyncio
+import functools
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from models.job import Job
+from services.ingestion import IngestionQueue
+
+
+def make_job(title):
+    return Job(
+        title=title,
+        company="Corp",
+        city="Paris",
+        url=f"http://{title}",
+        target_diploma_level="Master",
+        source="WTTJ",
+    )
+
+
+@pytest.fixture
+def data_service():
+    service = MagicMock()
+    service.get_job_rows.side_effect = lambda jobs: [
+        {"title": job["title"], "job_hash": job["url"]} for job in jobs
+    ]
+    return service
+
+
+@pytest.mark.asyncio
+async def test_rows_are_deduplicated_and_drained_on_close(data_service):
+    queue = IngestionQueue(data_service, max_batch_size=100, flush_interval=60)
+
+    queue.put([make_job("a"), make_job("b")])
+    queue.put([make_job("a")])
+    data_service.save_rows.assert_not_called()
+
+    await queue.close()
+
+    data_service.save_rows.assert_called_once()
+    rows = data_service.save_rows.call_args.args[0]
+    assert sorted(row["title"] for row in rows) == ["a", "b"]
+    assert queue.stats()["buffered_rows"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_flushed_without_waiting(data_service):
+    queue = IngestionQueue(data_service, max_batch_size=2, flush_interval=60)
+
+    queue.put([make_job("a"), make_job("b"), make_job("c")])
+    for _ in range(10):
+        await asyncio.sleep(0.01)
+        if queue.flush_count:
+            break
+
+    # both batches go out once the size threshold is crossed
+    assert data_service.save_rows.call_count == 2
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_batches_are_kept_for_the_next_flush(data_service):
+    queue = IngestionQueue(data_service, max_batch_size=10, flush_interval=60)
+    data_service.save_rows.side_effect = [RuntimeError("quota"), None]
+
+    queue.put([make_job("a")])
+    await queue.flush()
+    assert queue.stats()["buffered_rows"] == 1
+
+    await queue.close()
+    assert queue.stats()["flushed_rows"] == 1
+
+
+@pytest.mark.asyncio
+async def test_close_waits_for_the_batch_being_written(data_service):
+    queue = IngestionQueue(data_service, max_batch_size=1, flush_interval=60)
+    writing, release = asyncio.Event(), threading.Event()
+
+    def slow_save(rows):
+        writing.set()
+        release.wait(1)
+
+    data_service.save_rows.side_effect = slow_save
+    queue.put([make_job("a")])
+    await writing.wait()
+
+    closing = asyncio.create_task(queue.close())
+    await asyncio.sleep(0.01)
+    assert not closing.done()
+    release.set()
+    await closing
+
+    assert queue.stats() == {
+        "buffered_rows": 0,
+        "flushed_rows": 1,
+        "flush_count": 1,
+        "dropped_rows": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_rows_put_once_closed_are_refused(data_service):
+    queue = IngestionQueue(data_service, flush_interval=60)
+    await queue.close()
+
+    with pytest.raises(RuntimeError):
+        queue.put([make_job("late")])
+
+
+@pytest.mark.asyncio
+async def test_flush_due_waits_for_the_flush_interval(data_service):
+    queue = IngestionQueue(data_service, max_batch_size=100, flush_interval=60)
+    queue.put([make_job("a")])
+
+    await queue.flush_due()
+    data_service.save_rows.assert_not_called()
+
+    queue.buffered_at -= 60
+    await queue.flush_due()
+    data_service.save_rows.assert_called_once()
+    assert queue.buffered_at is None
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_shutdown_writes_the_rows_of_searches_still_persisting(
+    data_service, monkeypatch
+):
+    import dependencies as dp
+
+    # no Cloud Logging outside GCP
+    with patch("google.cloud.logging.Client"):
+        import main
+
+    for name in ("FT_CLIENT_ID", "FT_CLIENT_SECRET", "LBA_API_KEY", "WTTJ_APP_ID"):
+        monkeypatch.setenv(name, "test")
+    monkeypatch.setenv("WTTJ_API_KEY", "test")
+    main.get_settings.cache_clear()
+
+    queue = IngestionQueue(data_service, flush_interval=60)
+    stored = asyncio.Event()
+
+    async def persist():
+        # a search answered just before shutdown, still writing its cache
+        await stored.wait()
+        queue.put([make_job("late")])
+
+    tasks = {asyncio.create_task(persist())}
+    for name, value in (("get_persist_tasks", tasks), ("get_ingestion_queue", queue)):
+        cached = functools.lru_cache()(lambda value=value: value)
+        cached()
+        monkeypatch.setattr(dp, name, cached)
+
+    async with main.lifespan(main.app):
+        stored.set()
+
+    data_service.save_rows.assert_called_once()
+    assert queue.stats()["flushed_rows"] == 1
+    main.get_settings.cache_clear()
+    dp.get_http_pool.cache_clear()
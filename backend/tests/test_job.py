@@ -0,0 +1,28 @@
+from models.job import Job, dump_jobs, validate_jobs
+
+
+def make_row(title, **overrides):
+    return {
+        "title": title,
+        "company": "Corp",
+        "url": f"http://{title}",
+        "target_diploma_level": "Master",
+        "source": "WTTJ",
+        **overrides,
+    }
+
+
+def test_validate_jobs_builds_every_row():
+    jobs = validate_jobs([make_row("a"), make_row("b")])
+
+    assert [job.title for job in jobs] == ["a", "b"]
+    assert dump_jobs(jobs) == [job.model_dump() for job in jobs]
+
+
+def test_validate_jobs_skips_invalid_rows_only():
+    rows = [make_row("a"), make_row("b", target_diploma_level=None), make_row("c")]
+
+    jobs = validate_jobs(rows)
+
+    assert [job.title for job in jobs] == ["a", "c"]
+    assert all(isinstance(job, Job) for job in jobs)
@@ -0,0 +1,82 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services.oauth import OAuthToken
+
+
+def token_transport(responses):
+    """
+    Answer token requests with `responses` in order, an int for an error.
+    """
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.01)
+        response = responses[min(len(calls), len(responses)) - 1]
+        if isinstance(response, int):
+            return httpx.Response(response)
+        return httpx.Response(200, json=response)
+
+    return httpx.MockTransport(handler), calls
+
+
+def make_token(transport, **kwargs):
+    client = httpx.AsyncClient(transport=transport)
+    return OAuthToken(client, "https://auth.test/token", {}, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_fetch():
+    transport, calls = token_transport([{"access_token": "a", "expires_in": 1500}])
+    token = make_token(transport)
+
+    tokens = await asyncio.gather(*(token.get() for _ in range(10)))
+
+    assert tokens == ["a"] * 10
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_token_is_refreshed_in_the_background_before_expiry():
+    transport, calls = token_transport(
+        [
+            {"access_token": "a", "expires_in": 1500},
+            500,
+            {"access_token": "b", "expires_in": 1500},
+        ]
+    )
+    token = make_token(transport, retry_delay=0)
+
+    assert await token.get() == "a"
+    token.refresh_at = 0
+    # due for renewal: the current token is served meanwhile
+    assert await token.get() == "a"
+    assert await token.get() == "a"
+    await token.refreshing
+
+    assert await token.get() == "b"
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_refresh_runs_ahead_of_expiry_without_requests():
+    transport, calls = token_transport(
+        [
+            {"access_token": "a", "expires_in": 0.2},
+            {"access_token": "b", "expires_in": 1500},
+        ]
+    )
+    token = make_token(transport, refresh_margin=0.1)
+
+    assert await token.get() == "a"
+    # no request in between, the renewal is started by the timer
+    for _ in range(100):
+        if token.token == "b":
+            break
+        await asyncio.sleep(0.01)
+
+    assert len(calls) == 2
+    assert token.token == "b"
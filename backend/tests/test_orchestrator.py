@@ -1,19 +1,36 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
 from unittest.mock import MagicMock
 
+import httpx
 import pytest
 
 from models.job import Job
+from models.search import SourceStatus
+from services.cache import CacheEntry
+
+
+def pages(*results):
+    """
+    iter_jobs side effect yielding each list of jobs as a page.
+    """
+
+    async def iter_jobs(*args):
+        for jobs in results:
+            yield jobs
+
+    return iter_jobs
 
 
 @pytest.mark.asyncio
 async def test_find_jobs_aggregation(orchestrator, mock_dependencies):
     # mock cache as if the search is not cached, to fetch new data
-    mock_dependencies["cache_service"].get_jobs.return_value = None
+    mock_dependencies["cache_service"].get_entry.return_value = None
 
     # mock a ROME code, to avoid Orchestrator from skipping LBA
     mock_rome = MagicMock()
     mock_rome.code = "M1805"
-    mock_dependencies["rome_service"].search_rome.return_value = [mock_rome]
+    mock_dependencies["rome_service"].fetch_rome.return_value = [mock_rome]
 
     # mock APEC
     job_apec = Job(
@@ -24,7 +41,7 @@ async def test_find_jobs_aggregation(orchestrator, mock_dependencies):
         target_diploma_level="Master",
         source="APEC",
     )
-    mock_dependencies["apec_service"].search_jobs.return_value = [job_apec]
+    mock_dependencies["apec_service"].iter_jobs.side_effect = pages([job_apec])
 
     # mock WTTJ
     job_wttj = Job(
@@ -35,7 +52,7 @@ async def test_find_jobs_aggregation(orchestrator, mock_dependencies):
         target_diploma_level="Bachelor",
         source="WTTJ",
     )
-    mock_dependencies["wttj_service"].search_jobs.return_value = [job_wttj]
+    mock_dependencies["wttj_service"].iter_jobs.side_effect = pages([job_wttj])
 
     # mock LBA
     job_lba = Job(
@@ -46,13 +63,13 @@ async def test_find_jobs_aggregation(orchestrator, mock_dependencies):
         target_diploma_level="CAP",
         source="LBA",
     )
-    mock_dependencies["lba_service"].search_jobs.return_value = [job_lba]
+    mock_dependencies["lba_service"].fetch_jobs.return_value = [job_lba]
 
     # mock background tasks
     mock_background_tasks = MagicMock()
 
     # run the orchestrator logic
-    results = await orchestrator.find_jobs_by_query(
+    result = await orchestrator.find_jobs_by_query(
         query="Developer",
         longitude=2.35,
         latitude=48.85,
@@ -61,6 +78,8 @@ async def test_find_jobs_aggregation(orchestrator, mock_dependencies):
         background_tasks=mock_background_tasks,
     )
 
+    results = result.jobs
+
     # we expect 3 jobs total (1 from each provider)
     assert len(results) == 3
 
@@ -71,7 +90,518 @@ async def test_find_jobs_aggregation(orchestrator, mock_dependencies):
     assert "Dev LBA" in titles
 
     # verify logic
-    assert results[0].search_query == "Developer"
+    # tagged with the normalized query, like the cache keys
+    assert results[0].search_query == "developer"
+
+    # the cache and BigQuery writes run in a task of their own
+    mock_background_tasks.add_task.assert_not_called()
+    await asyncio.gather(*orchestrator.persisting)
+    mock_dependencies["cache_service"].save_jobs.assert_awaited_once()
+    mock_dependencies["data_service"].save_rows.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_searches_share_one_fan_out(
+    orchestrator, mock_dependencies
+):
+    mock_dependencies["cache_service"].get_entry.return_value = None
+    mock_dependencies["rome_service"].fetch_rome.return_value = []
+
+    release = asyncio.Event()
+
+    async def slow_wttj(*args):
+        await release.wait()
+        yield [
+            Job(
+                title="Dev WTTJ",
+                company="Jungle Corp",
+                city="Paris",
+                url="http://wttj",
+                target_diploma_level="Bachelor",
+                source="WTTJ",
+            )
+        ]
+
+    mock_dependencies["wttj_service"].iter_jobs.side_effect = slow_wttj
+    mock_dependencies["apec_service"].iter_jobs.side_effect = pages([])
+
+    background_tasks = [MagicMock() for _ in range(3)]
+    searches = [
+        asyncio.create_task(
+            orchestrator.find_jobs_by_query(
+                query="Developer",
+                longitude=2.35,
+                latitude=48.85,
+                radius=10,
+                insee="75056",
+                background_tasks=tasks,
+            )
+        )
+        for tasks in background_tasks
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*searches)
+
+    assert all(len(result.jobs) == 1 for result in results)
+    assert mock_dependencies["wttj_service"].iter_jobs.call_count == 1
+    assert mock_dependencies["rome_service"].fetch_rome.await_count == 1
+    # the cache and BigQuery writes run once for the shared fan-out
+    await asyncio.gather(*orchestrator.persisting)
+    mock_dependencies["cache_service"].save_jobs.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stale_cache_is_served_and_refreshed_once(
+    orchestrator, mock_dependencies
+):
+    stale_job = Job(
+        title="Old Dev",
+        company="Corp",
+        city="Paris",
+        url="http://old",
+        target_diploma_level="Master",
+        source="APEC",
+    )
+    now = datetime.now(timezone.utc)
+    mock_dependencies["cache_service"].get_entry.return_value = CacheEntry(
+        jobs=[stale_job],
+        refresh_at=now - timedelta(hours=1),
+        expire_at=now + timedelta(days=1),
+    )
+    mock_dependencies["rome_service"].fetch_rome.return_value = []
+    mock_dependencies["wttj_service"].iter_jobs.side_effect = pages([])
+    mock_dependencies["apec_service"].iter_jobs.side_effect = pages([])
+
+    background_tasks = [MagicMock(), MagicMock()]
+    for tasks in background_tasks:
+        result = await orchestrator.find_jobs_by_query(
+            query="Developer",
+            longitude=2.35,
+            latitude=48.85,
+            radius=10,
+            insee="75056",
+            background_tasks=tasks,
+        )
+        # stale jobs are returned without waiting on the providers
+        assert [job.title for job in result.jobs] == ["Old Dev"]
+
+    mock_dependencies["wttj_service"].iter_jobs.assert_not_called()
+    # only the first request schedules a refresh
+    assert background_tasks[0].add_task.call_count == 1
+    assert background_tasks[1].add_task.call_count == 0
+
+    refresh, *args = background_tasks[0].add_task.call_args.args
+    await refresh(*args)
+
+    mock_dependencies["wttj_service"].iter_jobs.assert_called_once()
+    mock_dependencies["cache_service"].save_jobs.assert_awaited_once()
+    assert not orchestrator.refreshing
+
+
+@pytest.mark.asyncio
+async def test_wttj_and_apec_do_not_wait_for_rome(orchestrator, mock_dependencies):
+    mock_dependencies["cache_service"].get_entry.return_value = None
+    rome_released = asyncio.Event()
+    calls = []
+
+    async def slow_rome(query):
+        calls.append("rome")
+        await rome_released.wait()
+        mock_rome = MagicMock()
+        mock_rome.code = "M1805"
+        return [mock_rome]
+
+    def provider(name):
+        async def search(*args):
+            calls.append(name)
+            # ROME is still pending while the other providers run
+            rome_released.set()
+            yield []
+
+        return search
+
+    async def lba(*args):
+        calls.append("lba")
+        return []
+
+    mock_dependencies["rome_service"].fetch_rome.side_effect = slow_rome
+    mock_dependencies["wttj_service"].iter_jobs.side_effect = provider("wttj")
+    mock_dependencies["apec_service"].iter_jobs.side_effect = provider("apec")
+    mock_dependencies["lba_service"].fetch_jobs.side_effect = lba
+
+    await orchestrator.find_jobs_by_query(
+        query="Developer",
+        longitude=2.35,
+        latitude=48.85,
+        radius=10,
+        insee="75056",
+        background_tasks=MagicMock(),
+    )
+
+    assert calls.index("wttj") < calls.index("lba")
+    assert calls.index("apec") < calls.index("lba")
+    mock_dependencies["lba_service"].fetch_jobs.assert_awaited_once_with(
+        48.85, 2.35, 10, "75056", "M1805"
+    )
+
+
+@pytest.mark.asyncio
+async def test_slow_and_failing_providers_give_partial_results(
+    orchestrator, mock_dependencies
+):
+    mock_dependencies["cache_service"].get_entry.return_value = None
+    mock_dependencies["rome_service"].fetch_rome.return_value = []
+    orchestrator.search_budget = 0.05
+
+    job_wttj = Job(
+        title="Dev WTTJ",
+        company="Jungle Corp",
+        city="Paris",
+        url="http://wttj",
+        target_diploma_level="Bachelor",
+        source="WTTJ",
+    )
+
+    async def hanging_wttj(*args):
+        yield [job_wttj]
+        await asyncio.sleep(10)
+        yield []
+
+    mock_dependencies["wttj_service"].iter_jobs.side_effect = hanging_wttj
+    mock_dependencies["apec_service"].iter_jobs.side_effect = RuntimeError("down")
+
+    result = await orchestrator.find_jobs_by_query(
+        query="Developer",
+        longitude=2.35,
+        latitude=48.85,
+        radius=10,
+        insee="75056",
+        background_tasks=MagicMock(),
+    )
+
+    # pages returned before the budget ran out are kept
+    assert [job.url for job in result.jobs] == ["http://wttj"]
+    assert result.sources["wttj"].status == "timeout"
+    assert result.sources["wttj"].count == 1
+    assert result.sources["apec"].status == "error"
+    # no ROME code, so LBA is not queried
+    assert result.sources["lba"].status == "skipped"
+    assert result.partial
+
+    # partial results are cached with the shorter TTL
+    await asyncio.gather(*orchestrator.persisting)
+    save_jobs = mock_dependencies["cache_service"].save_jobs
+    assert save_jobs.await_args.kwargs["partial"] is True
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_pages_and_statuses_then_a_summary(
+    orchestrator, mock_dependencies
+):
+    mock_dependencies["cache_service"].get_entry.return_value = None
+    mock_dependencies["rome_service"].fetch_rome.return_value = []
+    apec_released = asyncio.Event()
+
+    async def slow_apec(*args):
+        await apec_released.wait()
+        yield [
+            Job(
+                title="Dev Apec",
+                company="Apec Corp",
+                city="Paris",
+                url="http://apec",
+                target_diploma_level="Master",
+                source="APEC",
+            )
+        ]
+
+    mock_dependencies["wttj_service"].iter_jobs.side_effect = pages([])
+    mock_dependencies["apec_service"].iter_jobs.side_effect = slow_apec
+
+    events = orchestrator.stream_jobs_by_query(
+        query="Developer",
+        longitude=2.35,
+        latitude=48.85,
+        radius=10,
+        insee="75056",
+        background_tasks=MagicMock(),
+    )
+
+    # fast providers are streamed while APEC is still running
+    finished = set()
+    while finished != {"wttj", "lba"}:
+        event = await anext(events)
+        assert event["source"] != "apec"
+        if event["event"] == "status":
+            finished.add(event["source"])
+
+    apec_released.set()
+    remaining = [event async for event in events]
+
+    assert remaining[0] == {
+        "event": "jobs",
+        "source": "apec",
+        "results": remaining[0]["results"],
+    }
+    assert remaining[0]["results"][0].title == "Dev Apec"
+    assert remaining[1]["event"] == "status"
+    assert remaining[1]["count"] == 1
+    assert remaining[-1]["event"] == "summary"
+    assert remaining[-1]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_skips_provider_and_transient_errors_are_retried(
+    orchestrator, mock_dependencies
+):
+    mock_dependencies["cache_service"].get_entry.return_value = None
+    mock_dependencies["rome_service"].fetch_rome.return_value = []
+    orchestrator.breakers["apec"]._open()
+    attempts = []
+
+    async def flaky_wttj(*args):
+        attempts.append(args)
+        if len(attempts) == 1:
+            raise httpx.ConnectError("reset")
+        yield []
+
+    mock_dependencies["wttj_service"].iter_jobs.side_effect = flaky_wttj
+
+    result = await orchestrator.find_jobs_by_query(
+        query="Developer",
+        longitude=2.35,
+        latitude=48.85,
+        radius=10,
+        insee="75056",
+        background_tasks=MagicMock(),
+    )
+
+    assert result.sources["apec"].status == "circuit_open"
+    mock_dependencies["apec_service"].iter_jobs.assert_not_called()
+    assert result.sources["wttj"].status == "ok"
+    assert len(attempts) == 2
+
+
+@pytest.mark.asyncio
+async def test_warm_cache_only_refreshes_entries_due_soon(
+    orchestrator, mock_dependencies
+):
+    now = datetime.now(timezone.utc)
+    mock_dependencies["rome_service"].fetch_rome.return_value = []
+    mock_dependencies["wttj_service"].iter_jobs.side_effect = pages([])
+    mock_dependencies["apec_service"].iter_jobs.side_effect = pages([])
+    search = ("Developer", 2.35, 48.85, 10, "75056")
+
+    mock_dependencies["cache_service"].get_entry.return_value = CacheEntry(
+        jobs=[], refresh_at=now + timedelta(hours=10), expire_at=now + timedelta(days=2)
+    )
+    assert await orchestrator.warm_cache(*search, ahead=3600) is None
+
+    result = await orchestrator.warm_cache(*search, ahead=86400)
+
+    assert result.sources["wttj"].status == "ok"
+    # refreshed inline, with the cache and BigQuery written in the same pass
+    mock_dependencies["cache_service"].save_jobs.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_rome_lookup_reports_lba_as_error(orchestrator, mock_dependencies):
+    mock_dependencies["cache_service"].get_entry.return_value = None
+    mock_dependencies["rome_service"].fetch_rome.side_effect = httpx.HTTPError("down")
+    mock_dependencies["wttj_service"].iter_jobs.side_effect = pages([])
+    mock_dependencies["apec_service"].iter_jobs.side_effect = pages([])
+
+    result = await orchestrator.find_jobs_by_query(
+        query="Developer",
+        longitude=2.35,
+        latitude=48.85,
+        radius=10,
+        insee="75056",
+        background_tasks=MagicMock(),
+    )
+
+    assert result.sources["lba"].status == "error"
+    assert result.partial
+
+
+@pytest.mark.asyncio
+async def test_stream_leaves_out_jobs_already_streamed(orchestrator, mock_dependencies):
+    mock_dependencies["cache_service"].get_entry.return_value = None
+    mock_dependencies["rome_service"].fetch_rome.return_value = []
+    wttj_done = asyncio.Event()
+
+    def offer(source):
+        return Job(
+            title="Ingénieur DevOps",
+            company="Acme",
+            city="Paris",
+            url=f"http://{source}",
+            target_diploma_level="Master",
+            source=source,
+        )
+
+    async def wttj(*args):
+        yield [offer("WTTJ")]
+        wttj_done.set()
+
+    async def apec(*args):
+        await wttj_done.wait()
+        yield [offer("APEC")]
+
+    mock_dependencies["wttj_service"].iter_jobs.side_effect = wttj
+    mock_dependencies["apec_service"].iter_jobs.side_effect = apec
+
+    events = [
+        event
+        async for event in orchestrator.stream_jobs_by_query(
+            query="Developer",
+            longitude=2.35,
+            latitude=48.85,
+            radius=10,
+            insee="75056",
+            background_tasks=MagicMock(),
+        )
+    ]
+
+    streamed = [
+        job for event in events if event["event"] == "jobs" for job in event["results"]
+    ]
+    assert [job.source for job in streamed] == ["WTTJ"]
+    assert events[-1]["count"] == len(streamed)
+
+
+@pytest.mark.asyncio
+async def test_results_are_stored_when_the_request_goes_away(
+    orchestrator, mock_dependencies
+):
+    mock_dependencies["cache_service"].get_entry.return_value = None
+    mock_dependencies["rome_service"].fetch_rome.return_value = []
+    release = asyncio.Event()
+
+    async def slow_wttj(*args):
+        await release.wait()
+        yield []
+
+    mock_dependencies["wttj_service"].iter_jobs.side_effect = slow_wttj
+    mock_dependencies["apec_service"].iter_jobs.side_effect = pages([])
+
+    request = asyncio.create_task(
+        orchestrator.find_jobs_by_query(
+            query="Developer",
+            longitude=2.35,
+            latitude=48.85,
+            radius=10,
+            insee="75056",
+            background_tasks=MagicMock(),
+        )
+    )
+    await asyncio.sleep(0)
+    request.cancel()
+    release.set()
+
+    save_jobs = mock_dependencies["cache_service"].save_jobs
+    for _ in range(100):
+        if save_jobs.await_count:
+            break
+        await asyncio.sleep(0.01)
+    save_jobs.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stream_follower_replays_each_job_once(orchestrator, mock_dependencies):
+    mock_dependencies["cache_service"].get_entry.return_value = None
+    mock_dependencies["rome_service"].fetch_rome.return_value = []
+    release = asyncio.Event()
+
+    def offer(source, title="Ingénieur DevOps"):
+        return Job(
+            title=title,
+            company="Acme",
+            city="Paris",
+            url=f"http://{source}",
+            target_diploma_level="Master",
+            source=source,
+        )
+
+    async def wttj(*args):
+        await release.wait()
+        yield [offer("WTTJ")]
+
+    async def apec(*args):
+        await release.wait()
+        await asyncio.sleep(0)
+        # the merged job keeps this longer record, and its source
+        yield [offer("APEC", "Ingénieur DevOps (H/F)")]
+
+    mock_dependencies["wttj_service"].iter_jobs.side_effect = wttj
+    mock_dependencies["apec_service"].iter_jobs.side_effect = apec
+
+    async def stream():
+        return [
+            event
+            async for event in orchestrator.stream_jobs_by_query(
+                query="Developer",
+                longitude=2.35,
+                latitude=48.85,
+                radius=10,
+                insee="75056",
+                background_tasks=MagicMock(),
+            )
+        ]
+
+    leader = asyncio.create_task(stream())
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(stream())
+    await asyncio.sleep(0)
+    release.set()
+    await leader
+    events = await follower
+
+    streamed = [e for e in events if e["event"] == "jobs"]
+    assert [(e["source"], len(e["results"])) for e in streamed] == [("wttj", 1)]
+    assert streamed[0]["results"][0].sources == ["WTTJ", "APEC"]
+    assert events[-1]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_searches_flush_due_rows_after_responding(
+    orchestrator, mock_dependencies
+):
+    now = datetime.now(timezone.utc)
+    mock_dependencies["cache_service"].get_entry.return_value = CacheEntry(
+        jobs=[], refresh_at=now + timedelta(hours=1), expire_at=now + timedelta(days=1)
+    )
+    orchestrator.ingestion_queue = MagicMock()
+    background_tasks = MagicMock()
+
+    await orchestrator.find_jobs_by_query(
+        "Developer", 2.35, 48.85, 10, "75056", background_tasks
+    )
+
+    background_tasks.add_task.assert_called_once_with(
+        orchestrator.ingestion_queue.flush_due
+    )
+
+
+@pytest.mark.asyncio
+async def test_partial_cache_hit_is_reported_as_partial(
+    orchestrator, mock_dependencies
+):
+    now = datetime.now(timezone.utc)
+    sources = {"apec": SourceStatus(status="error", elapsed_ms=10)}
+    mock_dependencies["cache_service"].get_entry.return_value = CacheEntry(
+        jobs=[],
+        refresh_at=now + timedelta(minutes=10),
+        expire_at=now + timedelta(days=1),
+        partial=True,
+        sources=sources,
+    )
+
+    result = await orchestrator.find_jobs_by_query(
+        "Developer", 2.35, 48.85, 10, "75056", MagicMock()
+    )
 
-    # verify if the orchestrator tried to save cache and data
-    assert mock_background_tasks.add_task.call_count == 2
+    assert result.cached
+    assert result.partial
+    assert result.sources == sources
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from services.pagination import iter_pages
+
+
+@pytest.mark.asyncio
+async def test_pages_are_fetched_concurrently_until_max_results():
+    requested = []
+    running = 0
+    peak = 0
+
+    async def fetch_page(index):
+        nonlocal running, peak
+        requested.append(index)
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return [f"job-{index}-{i}" for i in range(10)], 1000
+
+    pages = [page async for page in iter_pages(fetch_page, 10, 45, concurrency=2)]
+
+    assert sum(len(page) for page in pages) == 45
+    assert sorted(requested) == [0, 1, 2, 3, 4]
+    assert peak <= 2
+
+
+@pytest.mark.asyncio
+async def test_short_first_page_stops_pagination():
+    async def fetch_page(index):
+        return ["job"], 1
+
+    pages = [page async for page in iter_pages(fetch_page, 10, 100, concurrency=2)]
+
+    assert pages == [["job"]]
@@ -0,0 +1,54 @@
+from unittest.mock import patch
+
+import httpx
+
+from services.resilience import CircuitBreaker, RetryBudget, is_retryable
+
+
+def test_circuit_opens_on_failures_then_probes():
+    breaker = CircuitBreaker(min_calls=4, failure_rate=0.5, open_seconds=30)
+    for success in (True, False, True, False):
+        assert breaker.allow()
+        breaker.record(success, 0.1)
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    with patch("services.resilience.monotonic", return_value=breaker.opened_at + 31):
+        assert breaker.allow()
+        # a single probe at a time
+        assert not breaker.allow()
+        breaker.record(True, 0.1)
+
+    assert breaker.state == "closed"
+
+
+def test_slow_calls_open_the_circuit():
+    breaker = CircuitBreaker(min_calls=2, slow_call_seconds=1, slow_call_rate=1)
+    breaker.record(True, 2)
+    breaker.record(True, 3)
+
+    assert breaker.state == "open"
+
+
+def test_retry_budget_is_a_share_of_calls():
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_balance=1)
+
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+def test_only_transient_errors_are_retried():
+    request = httpx.Request("GET", "https://provider.test")
+
+    def status_error(status):
+        response = httpx.Response(status, request=request)
+        return httpx.HTTPStatusError("", request=request, response=response)
+
+    assert is_retryable(httpx.ConnectError("refused"))
+    assert is_retryable(status_error(503))
+    assert not is_retryable(status_error(403))
+    assert not is_retryable(ValueError())
@@ -0,0 +1,56 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+import brotli
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+
+from models.job import Job
+from services.responses import FastJSONResponse, dumps, negotiate_encoding
+
+
+def make_request(accept_encoding):
+    headers = [(b"accept-encoding", accept_encoding.encode())]
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+def make_payload(count):
+    job = Job(
+        title="Dev",
+        company="Corp",
+        url="http://a",
+        target_diploma_level="Master",
+        source="WTTJ",
+    )
+    scraped_at = datetime(2026, 1, 1, 12, 30, tzinfo=timezone.utc)
+    return {"count": count, "results": [job] * count, "scraped_at": scraped_at}
+
+
+def test_dumps_matches_jsonable_encoder():
+    payload = make_payload(2)
+
+    assert json.loads(dumps(payload)) == jsonable_encoder(payload)
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("br;q=0.5, gzip") == "gzip"
+    assert negotiate_encoding("br;q=0, *") == "gzip"
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("") is None
+
+
+def test_large_bodies_are_compressed():
+    payload = make_payload(50)
+
+    br = FastJSONResponse(payload, make_request("gzip, br"))
+    gz = FastJSONResponse(payload, make_request("gzip"))
+    small = FastJSONResponse(make_payload(1), make_request("gzip"))
+
+    assert br.headers["content-encoding"] == "br"
+    assert brotli.decompress(br.body) == dumps(payload)
+    assert gz.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(gz.body) == dumps(payload)
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
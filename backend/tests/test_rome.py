@@ -0,0 +1,42 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from models.rome_code import RomeCode
+from services.rome import RomeService
+from services.text import normalize_text
+
+
+@pytest.fixture
+def rome_service():
+    service = RomeService("client_id", "client_secret", MagicMock())
+    service._fetch_rome = AsyncMock(
+        return_value=[RomeCode(libelle="Ingénieur cloud", code="M1805")]
+    )
+    return service
+
+
+def test_normalize_text():
+    assert normalize_text("  Ingénieur   CLOUD ") == "ingenieur cloud"
+
+
+@pytest.mark.asyncio
+async def test_equivalent_queries_share_one_lookup(rome_service):
+    first = await rome_service.search_rome("Ingénieur Cloud")
+    second = await rome_service.search_rome("  ingenieur  cloud")
+
+    assert [code.code for code in first] == ["M1805"]
+    assert [code.code for code in second] == ["M1805"]
+    rome_service._fetch_rome.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_lookups_are_not_cached(rome_service):
+    rome_service._fetch_rome.side_effect = httpx.HTTPError("down")
+
+    with pytest.raises(httpx.HTTPError):
+        await rome_service.fetch_rome("DevOps")
+    assert await rome_service.search_rome("DevOps") == []
+    assert await rome_service.search_rome("DevOps") == []
+    assert rome_service._fetch_rome.await_count == 3
@@ -0,0 +1,131 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.telemetry import (
+    record_stage,
+    render_metrics,
+    setup_telemetry,
+    shutdown_telemetry,
+    stage,
+)
+
+
+@pytest.fixture(autouse=True)
+def telemetry():
+    setup_telemetry()
+    yield
+    shutdown_telemetry()
+
+
+def metric_lines(name):
+    content, _ = render_metrics()
+    return [line for line in content.decode().splitlines() if line.startswith(name)]
+
+
+def test_stage_records_outcome():
+    with stage("test.ok"):
+        pass
+    with pytest.raises(ValueError):
+        with stage("test.error"):
+            raise ValueError("boom")
+
+    counts = metric_lines("jobnexus_stage_duration_milliseconds_count")
+    assert any('stage="test.ok"' in line and 'outcome="ok"' in line for line in counts)
+    assert any(
+        'stage="test.error"' in line and 'outcome="error"' in line for line in counts
+    )
+
+
+def test_record_stage_keeps_attributes():
+    record_stage("test.provider", 0.02, "timeout", provider="wttj")
+
+    buckets = metric_lines("jobnexus_stage_duration_milliseconds_bucket")
+    line = next(
+        line
+        for line in buckets
+        if 'stage="test.provider"' in line and 'le="25"' in line
+    )
+    assert 'provider="wttj"' in line and 'outcome="timeout"' in line
+    assert line.endswith(" 1.0")
+
+
+def test_setup_after_shutdown_records_again():
+    shutdown_telemetry()
+    record_stage("test.down", 0.01)
+    setup_telemetry()
+    record_stage("test.up", 0.01)
+
+    counts = metric_lines("jobnexus_stage_duration_milliseconds_count")
+    assert not any('stage="test.down"' in line for line in counts)
+    assert any('stage="test.up"' in line for line in counts)
+
+
+def provider_outcomes():
+    counts = metric_lines("jobnexus_stage_duration_milliseconds_count")
+    return {
+        line.split('outcome="')[1].split('"')[0]
+        for line in counts
+        if 'stage="provider"' in line and 'provider="wttj"' in line
+    }
+
+
+async def no_jobs(*args):
+    yield []
+
+
+def hang_wttj(mock_dependencies):
+    async def hanging(*args):
+        await asyncio.sleep(10)
+        yield []
+
+    mock_dependencies["rome_service"].fetch_rome.return_value = []
+    mock_dependencies["wttj_service"].iter_jobs.side_effect = hanging
+    mock_dependencies["apec_service"].iter_jobs.side_effect = no_jobs
+
+
+@pytest.mark.asyncio
+async def test_provider_out_of_budget_is_a_timeout(orchestrator, mock_dependencies):
+    hang_wttj(mock_dependencies)
+    orchestrator.search_budget = 0.05
+
+    searches = orchestrator._iter_providers("Developer", 2.35, 48.85, 10, "75056")
+    statuses = {name: status async for name, _, status in searches if status}
+    await asyncio.sleep(0)
+
+    assert statuses["wttj"].status == "timeout"
+    assert provider_outcomes() == {"timeout"}
+
+
+@pytest.mark.asyncio
+async def test_provider_cancelled_with_its_search_is_not_a_timeout(
+    orchestrator, mock_dependencies
+):
+    hang_wttj(mock_dependencies)
+
+    searches = orchestrator._iter_providers("Developer", 2.35, 48.85, 10, "75056")
+    async for name, _, status in searches:
+        if name == "lba" and status:
+            break
+    await searches.aclose()
+    await asyncio.sleep(0)
+
+    assert provider_outcomes() == {"cancelled"}
+
+
+@pytest.mark.asyncio
+async def test_streamed_search_records_its_stages(orchestrator, mock_dependencies):
+    mock_dependencies["cache_service"].get_entry.return_value = None
+    mock_dependencies["rome_service"].fetch_rome.return_value = []
+    for name in ("wttj_service", "apec_service"):
+        mock_dependencies[name].iter_jobs.side_effect = no_jobs
+
+    events = orchestrator.stream_jobs_by_query(
+        "Developer", 2.35, 48.85, 10, "75056", MagicMock()
+    )
+    assert [event async for event in events][-1]["event"] == "summary"
+
+    counts = metric_lines("jobnexus_stage_duration_milliseconds_count")
+    for name in ("search.providers", "dedupe"):
+        assert any(f'stage="{name}"' in line for line in counts)
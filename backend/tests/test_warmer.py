@@ -0,0 +1,38 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from models.search import SearchResult, SourceStatus
+from models.warmup import WarmTarget
+from services.warmer import CacheWarmer
+
+
+def target(query):
+    return WarmTarget(
+        query=query, latitude=48.85, longitude=2.35, radius=30, insee="75056"
+    )
+
+
+@pytest.mark.asyncio
+async def test_warmer_reports_each_target():
+    async def warm_cache(query, *args):
+        if query == "SRE":
+            raise RuntimeError("down")
+        if query == "DevOps":
+            return None
+        sources = {"apec": SourceStatus(status="timeout", elapsed_ms=1)}
+        return SearchResult(jobs=[], sources=sources)
+
+    orchestrator = AsyncMock()
+    orchestrator.warm_cache.side_effect = warm_cache
+    warmer = CacheWarmer(
+        orchestrator,
+        [target("DevOps"), target("SRE"), target("Cloud")],
+        ahead=3600,
+        provider_rates={"wttj": 1000, "apec": 1000},
+    )
+
+    results = await warmer.run()
+
+    assert [result["status"] for result in results] == ["fresh", "error", "partial"]
+    orchestrator.warm_cache.assert_any_await("DevOps", 2.35, 48.85, 30, "75056", 3600)
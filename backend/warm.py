@@ -0,0 +1,42 @@
+"""
+Refresh the cached searches listed in WARM_TARGETS, as POST /cache/warm does.
+
+    python warm.py
+"""
+
+import asyncio
+import json
+import logging
+
+import dependencies as dp
+from config import get_settings
+
+
+async def main():
+    settings = get_settings()
+    http_pool = dp.get_http_pool()
+    ingestion_queue = dp.get_ingestion_queue()
+    orchestrator = dp.get_orchestrator_service(
+        dp.get_lba_service(settings, http_pool),
+        dp.get_rome_service(settings, http_pool),
+        dp.get_wttj_service(settings, http_pool),
+        dp.get_cache_service(settings),
+        dp.get_apec_service(settings, http_pool),
+        dp.get_data_service(),
+        ingestion_queue,
+        settings,
+    )
+
+    try:
+        results = await dp.get_cache_warmer(orchestrator, settings).run()
+    finally:
+        # write the refreshed jobs to BigQuery before exiting
+        await ingestion_queue.close()
+        await http_pool.aclose()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -24,25 +24,29 @@ JOB_CATEGORIES = [
 st.set_page_config(page_title=PAGE_TITLE, layout="wide")
 
 
+def _auth_headers() -> dict:
+    headers = {}
+
+    if "localhost" not in BACKEND_URL:
+        auth_req = GoogleRequest()
+        token = id_token.fetch_id_token(auth_req, BACKEND_URL)
+        headers["Authorization"] = f"Bearer {token}"
+
+    return headers
+
+
 @st.cache_data(ttl=3600)
 def load_data(category: str) -> pd.DataFrame:
     try:
-        headers = {}
-
-        if "localhost" not in BACKEND_URL:
-            auth_req = GoogleRequest()
-            token = id_token.fetch_id_token(auth_req, BACKEND_URL)
-            headers["Authorization"] = f"Bearer {token}"
-
         response = requests.get(
             f"{BACKEND_URL}/opportunities",
-            params={"q": category, "limit": 1000},
-            headers=headers,
+            params={"q": category, "limit": 1000, "format": "columns"},
+            headers=_auth_headers(),
         )
         response.raise_for_status()
         data = response.json()
 
-        df = pd.DataFrame(data.get("results", []))
+        df = pd.DataFrame(data.get("columns", {}))
 
         if not df.empty:
             df["scraped_at"] = pd.to_datetime(df["scraped_at"]).dt.date
@@ -55,6 +59,22 @@ def load_data(category: str) -> pd.DataFrame:
         return _get_empty_df()
 
 
+@st.cache_data(ttl=3600)
+def load_stats(category: str) -> dict:
+    try:
+        response = requests.get(
+            f"{BACKEND_URL}/opportunities/stats",
+            params={"q": category},
+            headers=_auth_headers(),
+        )
+        response.raise_for_status()
+        return response.json()
+
+    except Exception as e:
+        st.error(f"API Error: {e}")
+        return {}
+
+
 def _get_empty_df() -> pd.DataFrame:
     columns = [
         "title",
@@ -69,21 +89,12 @@ def _get_empty_df() -> pd.DataFrame:
     return pd.DataFrame(columns=columns)
 
 
-def render_metrics(df: pd.DataFrame):
-    visible_companies = df[
-        ~df["company"].isin(["Entreprise confidentielle", "Confidentiel"])
-    ]
-
-    top_recruiter = (
-        visible_companies["company"].mode()[0] if not visible_companies.empty else "N/A"
-    )
-    top_city = df["city"].mode()[0] if not df["city"].empty else "N/A"
-
+def render_metrics(stats: dict):
     c1, c2, c3, c4 = st.columns(4)
-    c1.metric("Active Jobs (30d)", len(df))
-    c2.metric("Top Recruiter", top_recruiter)
-    c3.metric("Top City", top_city)
-    c4.metric("Sources", df["source"].nunique())
+    c1.metric("Active Jobs (30d)", stats.get("total", 0))
+    c2.metric("Top Recruiter", stats.get("top_recruiter") or "N/A")
+    c3.metric("Top City", stats.get("top_city") or "N/A")
+    c4.metric("Sources", stats.get("sources", 0))
 
 
 def render_daily_offers(df: pd.DataFrame):
@@ -106,9 +117,14 @@ def render_daily_offers(df: pd.DataFrame):
         st.divider()
 
 
-def render_charts(df: pd.DataFrame):
+def render_charts(stats: dict):
     st.subheader("New Offers per Day")
-    daily_counts = df["scraped_at"].value_counts().sort_index()
+    daily = stats.get("daily", [])
+    daily_counts = pd.Series(
+        [item["count"] for item in daily],
+        index=pd.to_datetime([item["day"] for item in daily]).date,
+        name="count",
+    )
     st.bar_chart(daily_counts, color="#8b5cf6")
     st.divider()
 
@@ -139,6 +155,7 @@ def main():
     selected_category = st.selectbox("Select Job Category", JOB_CATEGORIES)
 
     df = load_data(selected_category)
+    stats = load_stats(selected_category)
 
     if df.empty:
         st.info(
@@ -146,10 +163,10 @@ def main():
         )
         return
 
-    render_metrics(df)
+    render_metrics(stats)
     st.divider()
     render_daily_offers(df)
-    render_charts(df)
+    render_charts(stats)
     render_full_table(df)
 
 
@@ -95,6 +95,31 @@ resource "google_cloud_run_v2_service" "jobnexus_service" {
         value = "${var.project_id}.${google_bigquery_dataset.job_data.dataset_id}.${google_bigquery_table.job_table.table_id}"
       }
 
+      env {
+        name = "WARM_TARGETS"
+        value = jsonencode([
+          for job in var.jobs : {
+            query     = job
+            latitude  = tonumber(var.default_latitude)
+            longitude = tonumber(var.default_longitude)
+            radius    = tonumber(var.default_radius)
+            insee     = var.default_insee
+          }
+        ])
+      }
+
+      # ROME lookups are shared through Firestore (see rome_searches_ttl)
+      env {
+        name  = "ROME_CACHE_PERSIST"
+        value = "true"
+      }
+
+      # /metrics stays off on the public service, metrics are pushed instead
+      env {
+        name  = "OTLP_ENDPOINT"
+        value = var.otlp_endpoint
+      }
+
       # Startup probe to check if the app is ready
       startup_probe {
         initial_delay_seconds = 0
@@ -28,6 +28,17 @@ resource "google_firestore_field" "job_searches_ttl" {
   depends_on = [google_firestore_database.database]
 }
 
+resource "google_firestore_field" "rome_searches_ttl" {
+  project    = var.project_id
+  database   = google_firestore_database.database.name
+  collection = "rome_searches"
+  field      = "expire_at"
+
+  ttl_config {}
+
+  depends_on = [google_firestore_database.database]
+}
+
 # ------------------------------------------------------------------------------
 # BigQuery Database
 # ------------------------------------------------------------------------------
@@ -54,9 +65,18 @@ resource "google_bigquery_table" "job_table" {
   dataset_id = google_bigquery_dataset.job_data.dataset_id
   table_id   = "jobnexus_job_table"
 
+  # the table holds the whole history: never let a plan replace it, migrate
+  # it instead (see migrations/)
+  deletion_protection = true
+
+  # queries filter on a recent scraped_at window and on search_query, the
+  # MERGE matches on job_hash
   time_partitioning {
-    type = "DAY"
+    type  = "DAY"
+    field = "scraped_at"
   }
 
+  clustering = ["search_query", "job_hash"]
+
   schema = file("${path.module}/schemas/job_table.json")
 }
@@ -0,0 +1,26 @@
+-- Partition and cluster an existing job table without losing its rows.
+--
+-- Adding time_partitioning and clustering to google_bigquery_table.job_table
+-- would make Terraform destroy and recreate the table. Run this once before
+-- `terraform apply` instead: the swapped table already matches the config, so
+-- the plan no longer replaces it.
+--
+--   bq query --use_legacy_sql=false --project_id=<project> \
+--     < migrations/001_partition_job_table.sql
+--
+-- MERGE batches written between the DROP and the RENAME fail and are retried
+-- by the ingestion queue on its next flush.
+
+-- same schema, descriptions and REQUIRED columns as the current table
+CREATE TABLE `jobnexus_job_data.jobnexus_job_table_partitioned`
+LIKE `jobnexus_job_data.jobnexus_job_table`
+PARTITION BY DATE(scraped_at)
+CLUSTER BY search_query, job_hash;
+
+INSERT INTO `jobnexus_job_data.jobnexus_job_table_partitioned`
+SELECT * FROM `jobnexus_job_data.jobnexus_job_table`;
+
+DROP TABLE `jobnexus_job_data.jobnexus_job_table`;
+
+ALTER TABLE `jobnexus_job_data.jobnexus_job_table_partitioned`
+RENAME TO jobnexus_job_table;
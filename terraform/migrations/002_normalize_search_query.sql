@@ -0,0 +1,14 @@
+-- Tag the rows written before search_query was normalized the way new rows
+-- are (services.text.normalize_text: accents stripped, whitespace collapsed,
+-- lowercase), so /opportunities finds them whatever the spelling.
+--
+--   bq query --use_legacy_sql=false --project_id=<project> \
+--     < migrations/002_normalize_search_query.sql
+
+UPDATE `jobnexus_job_data.jobnexus_job_table`
+SET search_query = LOWER(TRIM(REGEXP_REPLACE(
+    REGEXP_REPLACE(NORMALIZE(search_query, NFKD), r'\p{M}', ''),
+    r'\s+',
+    ' '
+)))
+WHERE TRUE;
@@ -58,11 +58,12 @@ resource "google_api_gateway_gateway" "jobnexus_gateway" {
 # Cloud Scheduler
 # ------------------------------------------------------------------------------
 
-resource "google_cloud_scheduler_job" "data_job" {
-  for_each = var.jobs
-  name = "jobnexus-search-${lower(each.value)}"
-  description = "A job to gather new offers every day"
-  schedule = "0 6 * * *"
+# Refreshes the searches listed in WARM_TARGETS (one per tracked job) before
+# their cache entries go stale, and stores the new offers in BigQuery
+resource "google_cloud_scheduler_job" "warm_job" {
+  name = "jobnexus-cache-warm"
+  description = "A job to gather new offers and keep the tracked searches cached"
+  schedule = "0 */6 * * *"
   time_zone = "Europe/Paris"
   attempt_deadline = "320s"
 
@@ -71,8 +72,8 @@ resource "google_cloud_scheduler_job" "data_job" {
   }
 
   http_target {
-    http_method = "GET"
-    uri = "${google_cloud_run_v2_service.jobnexus_service.uri}/search?q=${each.value}&latitude=${var.default_latitude}&longitude=${var.default_longitude}&radius=${var.default_radius}&insee=${var.default_insee}"
+    http_method = "POST"
+    uri = "${google_cloud_run_v2_service.jobnexus_service.uri}/cache/warm"
     oidc_token {
       service_account_email = google_service_account.scheduler_sa.email
     }
@@ -62,3 +62,9 @@ variable "run_sa_secrets" {
     "wttj-app-id"
   ]
 }
+
+variable "otlp_endpoint" {
+  description = "Base URL of the OpenTelemetry collector (OTLP/HTTP) the backend pushes metrics and traces to, none when empty"
+  type        = string
+  default     = ""
+}